@@ -0,0 +1,193 @@
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+from project_management import connection, projects, users
+from project_management.bootstrap import bootstrap
+from timing import percentile
+
+# Load test for api_server.py: N keep-alive clients read (half of them revalidating with
+# If-None-Match) and write (status changes and comments) against one SQLite file, and the
+# run reports requests/sec, per-endpoint latency and response statuses.
+
+# Scratch database like stress_test.py: one member with a project full of tasks assigned to them
+def build_scratch_db(path, task_count, username, password):
+    connection.DB_PATH = path
+    bootstrap()
+    users.create_user(username, password, f'{username}@example.com')
+    projects.create_project('Load test', 'API load test project')
+    user_id = users.check_user(username, password)[0]
+    project_id = projects.get_projects()[-1][0]
+    with connection.transaction() as c:
+        c.executemany('''INSERT INTO tasks (project_id, name, description, description_text, assigned_to, status)
+                         VALUES (?, ?, ?, ?, ?, ?)''',
+                      [(project_id, f'Task {i}', 'API load test task', 'API load test task', user_id, 'New')
+                       for i in range(task_count)])
+        c.executemany('INSERT INTO notifications (user_id, message, created_at) VALUES (?, ?, ?)',
+                      [(user_id, f'Notification {i}', datetime.now()) for i in range(200)])
+
+# Run api_server.py on a free port and return the process and its base URL
+def start_server(db_path):
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_server.py'),
+                               '--db', db_path, '--port', '0'], stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith('Serving API on '):
+        server.kill()
+        raise SystemExit(f'api_server.py did not start: {line!r}')
+    return server, line.split()[3]
+
+class ApiClient:
+    def __init__(self, url, token=None, accept_gzip=True):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        self.token = token
+        self.accept_gzip = accept_gzip
+
+    # Returns (status, headers, body bytes as received)
+    def request(self, method, path, payload=None, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if self.accept_gzip:
+            headers['Accept-Encoding'] = 'gzip'
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, path, body, headers)
+            response = self.conn.getresponse()
+            return response.status, response.headers, response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()  # Reconnects on the next request
+            raise
+
+    def json(self, method, path, payload=None):
+        status, headers, body = self.request(method, path, payload)
+        if headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return status, json.loads(body)
+
+def run_client(url, token, project_id, task_ids, args, deadline, results):
+    client = ApiClient(url, token, not args.no_gzip)
+    etags = {}
+    timings = defaultdict(list)
+    statuses = Counter()
+    received = 0
+    errors = []
+    reads = [('projects', '/api/projects'),
+             ('tasks', f'/api/projects/{project_id}/tasks?limit={args.page_size}'),
+             ('notifications', f'/api/notifications?limit={args.page_size}')]
+    while time.monotonic() < deadline:
+        task_id = random.choice(task_ids)
+        if random.random() < args.write_ratio:
+            if random.random() < 0.5:
+                name, method, path = 'update status', 'PATCH', f'/api/tasks/{task_id}'
+                payload = {'status': random.choice(['Opened', 'In-Progress'])}
+            else:
+                name, method, path = 'add comment', 'POST', f'/api/tasks/{task_id}/comments'
+                payload = {'content': 'API load test comment'}
+            headers = None
+        else:
+            name, path = random.choice(reads)
+            method, payload, headers = 'GET', None, None
+            if path in etags and random.random() < args.conditional_ratio:
+                name, headers = f'{name} (conditional)', {'If-None-Match': etags[path]}
+        start = time.perf_counter()
+        try:
+            status, response_headers, body = client.request(method, path, payload, headers)
+        except (http.client.HTTPException, OSError) as e:
+            errors.append(f'{type(e).__name__}: {e}')
+            continue
+        timings[name].append(time.perf_counter() - start)
+        statuses[status] += 1
+        received += len(body)
+        if method == 'GET' and response_headers.get('ETag'):
+            etags[path] = response_headers['ETag']
+    results.append((timings, statuses, received, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure api_server.py throughput with concurrent keep-alive clients')
+    parser.add_argument('--url', help='Load an already running server instead of starting one')
+    parser.add_argument('--db', help='Start the server on this database (default: a scratch one)')
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--project', type=int, help='Project to load (default: the last one)')
+    parser.add_argument('--tasks', type=int, default=500, help='Tasks in the scratch database')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--conditional-ratio', type=float, default=0.5,
+                        help='Share of repeated reads sent with If-None-Match')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--no-gzip', action='store_true', help='Do not send Accept-Encoding: gzip')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tempfile.mkdtemp(), 'project_management.db')
+            build_scratch_db(db_path, args.tasks, args.username, args.password)
+        server, url = start_server(db_path)
+    try:
+        status, login = ApiClient(url).json('POST', '/api/login', {'username': args.username, 'password': args.password})
+        if status != 200:
+            raise SystemExit(f"Login failed ({status}): {login['error']}")
+        api = ApiClient(url, login['token'])
+        project_id = args.project or api.json('GET', '/api/projects')[1]['items'][-1]['id']
+        task_ids = [task['id'] for task in
+                    api.json('GET', f'/api/projects/{project_id}/tasks?limit=500')[1]['items']]
+        if not task_ids:
+            raise SystemExit(f'{args.username} has no tasks in project {project_id}')
+
+        results = []
+        deadline = time.monotonic() + args.seconds
+        threads = [threading.Thread(target=run_client,
+                                    args=(url, login['token'], project_id, task_ids, args, deadline, results))
+                   for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    timings = defaultdict(list)
+    statuses = Counter()
+    for client_timings, client_statuses, _, _ in results:
+        for name, values in client_timings.items():
+            timings[name].extend(values)
+        statuses.update(client_statuses)
+    errors = [e for client in results for e in client[3]]
+    received = sum(client[2] for client in results)
+    total = sum(len(values) for values in timings.values())
+    print(f"{args.clients} clients, {args.seconds:g}s, {total / args.seconds:.1f} req/s, "
+          f"{received / args.seconds / 1024:.1f} KiB/s received")
+    for name in sorted(timings):
+        values = timings[name]
+        print(f"{name:28} {len(values) / args.seconds:8.1f} req/s  "
+              f"p50 {percentile(values, 0.5) * 1000:7.2f} ms  p95 {percentile(values, 0.95) * 1000:7.2f} ms  "
+              f"p99 {percentile(values, 0.99) * 1000:7.2f} ms")
+    print('statuses: ' + ', '.join(f'{status} x{count}' for status, count in sorted(statuses.items())))
+    print(f"connection errors: {len(errors)}")
+    for error in sorted(set(errors)):
+        print(f"  {error}")
+    failed = errors or any(status >= 500 for status in statuses)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from project_management.credentials import LoginThrottled
+from project_management import connection
+from project_management.bootstrap import bootstrap
+from project_management.comments import add_comment, get_comments
+from project_management.notifications import get_notification_feed
+from project_management.projects import get_projects, project_exists
+from project_management.tasks import TASK_STATUSES, create_task, get_task, get_tasks, update_task_status
+from project_management.users import check_user, is_assignable_user
+
+# JSON API over the project_management data layer, for integrations and bulk clients.
+# Emails queued by the API are delivered by the app's outbox worker (or `python -m project_management.email_outbox`).
+
+# API server settings
+API_HOST = '127.0.0.1'
+API_PORT = 8502
+API_PAGE_SIZE = 50  # Default page size for list endpoints
+API_MAX_PAGE_SIZE = 500
+API_TOKEN_TTL_SECONDS = 8 * 3600  # Lifetime of a token issued by POST /api/login
+API_GZIP_MIN_BYTES = 1024  # Smaller responses are not worth compressing
+SQLITE_MAX_INTEGER = 2 ** 63 - 1  # Larger ids cannot be bound to a query
+# Projects, users and admins are created and invalidated by the app in another process, so this
+# process reads them from the database every time (the app's ReadCache TTL would serve stale lists)
+API_READ_CACHE_TTL_SECONDS = 0
+
+TASK_FIELDS = ('id', 'project_id', 'name', 'description', 'assigned_to', 'status')
+NOTIFICATION_FIELDS = ('id', 'message', 'created_at', 'is_read')
+
+class ApiError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+# Bearer tokens issued at login, held in memory; a restart logs every client out
+class TokenStore:
+    def __init__(self, ttl=API_TOKEN_TTL_SECONDS):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.tokens = {}  # token -> (expires_at, user)
+
+    def issue(self, user):
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self.lock:
+            self.tokens = {key: value for key, value in self.tokens.items() if value[0] > now}
+            self.tokens[token] = (now + self.ttl, user)
+        return token
+
+    def lookup(self, token):
+        with self.lock:
+            entry = self.tokens.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+tokens = TokenStore()
+
+def parse_int(value, name, minimum=0, maximum=SQLITE_MAX_INTEGER):
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if not minimum <= value <= maximum:
+        raise ApiError(400, f"{name} must be between {minimum} and {maximum}")
+    return value
+
+# Ids and limits from the query string, within the range SQLite can store
+def int_param(query, name, default=None, minimum=0, maximum=SQLITE_MAX_INTEGER):
+    values = query.get(name)
+    if not values:
+        return default
+    return parse_int(values[-1], name, minimum, maximum)
+
+# The id in a resource path such as /api/tasks/<id>; one no row can have is simply not found
+def path_id(match):
+    value = int(match.group(1))
+    if value > SQLITE_MAX_INTEGER:
+        raise ApiError(404, 'Not found')
+    return value
+
+# Repeated or comma separated values: ?status=New,Opened or ?status=New&status=Opened
+def list_param(query, name):
+    return [value for values in query.get(name, []) for value in values.split(',') if value]
+
+def page_limit(query):
+    return int_param(query, 'limit', API_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+
+def visible_task(user, task_id):
+    task = get_task(task_id)
+    if task is None or not (user['is_admin'] or task[4] == user['id']):
+        raise ApiError(404, 'Task not found')
+    return task
+
+def login(request, user, match, query, body):
+    if not isinstance(body.get('username'), str) or not isinstance(body.get('password'), str):
+        raise ApiError(400, 'username and password are required')
+    row = check_user(body['username'], body['password'], request.client_address[0])
+    if row is None:
+        raise ApiError(401, 'Invalid username or password')
+    user = {'id': row[0], 'username': row[1], 'is_admin': bool(row[3])}
+    return 200, {'token': tokens.issue(user), 'expires_in': tokens.ttl, 'user': user}
+
+def list_projects(request, user, match, query, body):
+    return 200, {'items': [{'id': project_id, 'name': name, 'description': description}
+                           for project_id, name, description in get_projects()]}
+
+# Keyset pagination: pass next_after_id from one page as after_id for the next
+def list_tasks(request, user, match, query, body):
+    project_id = path_id(match)
+    if not project_exists(project_id):
+        raise ApiError(404, 'Project not found')
+    statuses = list_param(query, 'status')
+    unknown = set(statuses) - set(TASK_STATUSES)
+    if unknown:
+        raise ApiError(400, f"Unknown status: {', '.join(sorted(unknown))}")
+    assignee_ids = [parse_int(value, 'assignee') for value in list_param(query, 'assignee')]
+    limit = page_limit(query)
+    rows = get_tasks(project_id, user['id'], statuses, assignee_ids, int_param(query, 'after_id'), limit + 1)
+    return 200, {'items': [dict(zip(TASK_FIELDS, row)) for row in rows[:limit]],
+                 'next_after_id': rows[limit - 1][0] if len(rows) > limit else None}
+
+def new_task(request, user, match, query, body):
+    if not user['is_admin']:
+        raise ApiError(403, 'Only admins can create tasks')
+    project_id = path_id(match)
+    if not project_exists(project_id):
+        raise ApiError(404, 'Project not found')
+    name, description, assigned_to = body.get('name'), body.get('description'), body.get('assigned_to')
+    if not isinstance(name, str) or not name or not isinstance(description, str) or not description:
+        raise ApiError(400, 'name and description are required')
+    if (not isinstance(assigned_to, int) or not 0 <= assigned_to <= SQLITE_MAX_INTEGER
+            or not is_assignable_user(assigned_to)):
+        raise ApiError(400, 'assigned_to must be the id of a non-admin user')
+    task_id = create_task(project_id, name, description, assigned_to, bool(body.get('notify_email')),
+                          bool(body.get('notify_in_app')), bool(body.get('notify_sms')))
+    return 201, dict(zip(TASK_FIELDS, get_task(task_id)))
+
+# The same rules as the task list in the app: assignees cannot close tasks or change closed ones,
+# and a task needs a comment before it is Completed or Closed
+def change_task_status(request, user, match, query, body):
+    task = visible_task(user, path_id(match))
+    status = body.get('status')
+    if status not in TASK_STATUSES:
+        raise ApiError(400, f"status must be one of: {', '.join(TASK_STATUSES)}")
+    if not user['is_admin'] and (task[5] == 'Closed' or status == 'Closed'):
+        raise ApiError(403, 'Only admins can close tasks or change closed ones')
+    if status != task[5]:
+        if status in ('Completed', 'Closed') and not get_comments(task[0]):
+            raise ApiError(409, 'Add a comment before marking the task as Completed or Closed')
+        if not update_task_status(task[0], status, user['id']):
+            raise ApiError(404, 'Task not found')
+    return 200, dict(zip(TASK_FIELDS, get_task(task[0])))
+
+def new_comment(request, user, match, query, body):
+    task = visible_task(user, path_id(match))
+    content = body.get('content')
+    if not isinstance(content, str) or not content.strip():
+        raise ApiError(400, 'content is required')
+    if task[5] == 'Closed' and not user['is_admin']:
+        raise ApiError(403, 'Closed tasks only take comments from admins')
+    if not add_comment(task[0], user['id'], content):
+        raise ApiError(404, 'Task not found')
+    return 201, {'task_id': task[0], 'content': content}
+
+# Newest first; pass next_before_id from one page as before_id for older ones, or the newest id
+# seen as after_id to poll for new notifications
+def list_notifications(request, user, match, query, body):
+    limit = page_limit(query)
+    rows = get_notification_feed(user['id'], int_param(query, 'after_id'), limit + 1, int_param(query, 'before_id'))
+    return 200, {'items': [dict(zip(NOTIFICATION_FIELDS, row)) for row in rows[:limit]],
+                 'next_before_id': rows[limit - 1][0] if len(rows) > limit else None}
+
+# (method, path pattern, handler, requires a token)
+ROUTES = [
+    ('POST', re.compile(r'/api/login'), login, False),
+    ('GET', re.compile(r'/api/projects'), list_projects, True),
+    ('GET', re.compile(r'/api/projects/(\d+)/tasks'), list_tasks, True),
+    ('POST', re.compile(r'/api/projects/(\d+)/tasks'), new_task, True),
+    ('PATCH', re.compile(r'/api/tasks/(\d+)'), change_task_status, True),
+    ('POST', re.compile(r'/api/tasks/(\d+)/comments'), new_comment, True),
+    ('GET', re.compile(r'/api/notifications'), list_notifications, True),
+]
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so a client's requests reuse one thread and its connection
+    server_version = 'ProjectManagementAPI/1.0'
+    disable_nagle_algorithm = True  # Headers and body are separate writes; don't hold the body for an ACK
+    log_requests = False
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def log_message(self, format, *args):
+        if self.log_requests:
+            super().log_message(format, *args)
+
+    # Errors are logged whether or not requests are
+    def log_error(self, format, *args):
+        super().log_message(format, *args)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True  # The body cannot be skipped, so the connection cannot be reused
+            raise ApiError(400, 'Invalid Content-Length')
+        raw = self.rfile.read(length) if length else b''
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise ApiError(400, 'Request body must be JSON')
+        if not isinstance(body, dict):
+            raise ApiError(400, 'Request body must be a JSON object')
+        return body
+
+    def authenticate(self):
+        scheme, _, token = (self.headers.get('Authorization') or '').partition(' ')
+        user = tokens.lookup(token.strip()) if scheme.lower() == 'bearer' else None
+        if user is None:
+            raise ApiError(401, 'A valid bearer token is required', {'WWW-Authenticate': 'Bearer'})
+        return user
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        headers = {}
+        try:
+            body = self.read_body() if method != 'GET' else {}
+            routes = [(route, route[1].fullmatch(url.path)) for route in ROUTES]
+            routes = [(route, match) for route, match in routes if match]
+            if not routes:
+                raise ApiError(404, 'Not found')
+            allowed = [(route, match) for route, match in routes if route[0] == method]
+            if not allowed:
+                raise ApiError(405, 'Method not allowed', {'Allow': ', '.join(route[0] for route, _ in routes)})
+            (_, _, handler, needs_token), match = allowed[0]
+            user = self.authenticate() if needs_token else None
+            status, payload = handler(self, user, match, parse_qs(url.query), body)
+        except ApiError as e:
+            status, payload, headers = e.status, {'error': str(e)}, e.headers
+        except LoginThrottled as e:
+            status, payload, headers = 429, {'error': str(e)}, {'Retry-After': str(int(e.retry_after) + 1)}
+        except sqlite3.OperationalError as e:
+            status, payload, headers = 503, {'error': str(e)}, {'Retry-After': '1'}
+        except Exception:
+            self.log_error('Error handling %s %s', method, self.path)
+            traceback.print_exc()
+            status, payload, headers = 500, {'error': 'Internal server error'}, {}
+        # Keep-alive handler threads live as long as their client; hand the connection to other requests
+        connection.release_connection()
+        self.send_json(status, payload, headers, conditional=method == 'GET' and status == 200)
+
+    # GET responses carry an ETag of their JSON, so clients can revalidate with If-None-Match and get
+    # a 304 without the body. The gzip variant has its own ETag, as HTTP requires.
+    def send_json(self, status, payload, headers, conditional=False):
+        body = json.dumps(payload, default=str, separators=(',', ':')).encode()
+        headers = {'Content-Type': 'application/json', **headers}
+        compress = len(body) >= API_GZIP_MIN_BYTES and 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if conditional:
+            etag = hashlib.sha1(body).hexdigest()
+            headers['ETag'] = f'"{etag}-gzip"' if compress else f'"{etag}"'
+            headers['Cache-Control'] = 'private, no-cache'
+            headers['Vary'] = 'Accept-Encoding'
+            requested = {tag.strip().removeprefix('W/').strip('"').removesuffix('-gzip')
+                         for tag in (self.headers.get('If-None-Match') or '').split(',')}
+            if etag in requested or '*' in requested:
+                self.send_response(304)
+                for name, value in headers.items():
+                    if name != 'Content-Type':
+                        self.send_header(name, value)
+                self.end_headers()
+                return
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the project management data over a JSON API')
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT, help='0 picks a free port')
+    parser.add_argument('--db', default=connection.DB_PATH)
+    parser.add_argument('--log', action='store_true', help='Log every request to stderr')
+    args = parser.parse_args()
+
+    connection.DB_PATH = args.db
+    connection.read_cache.ttl = API_READ_CACHE_TTL_SECONDS
+    startup = bootstrap()
+    ApiHandler.log_requests = args.log
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"Serving API on http://{args.host}:{server.server_address[1]} (startup {startup.summary()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,30 @@
 import streamlit as st
-import sqlite3
-import hashlib
 from datetime import datetime
 from streamlit_quill import st_quill
-import re
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from project_management.email_outbox import OutboxWorker
+from project_management.maintenance import MaintenanceWorker
+from import_export import connect, export_jsonl, import_rows, read_jsonl
+import io
+import json
+import sqlite3
+import tempfile
+from contextlib import closing
+from collections import deque
+from project_management.query_profiler import RunProfile
+from project_management.credentials import CredentialsBusy, LoginThrottled
+from project_management.connection import DB_PATH, change_bus, get_connection, read_cache
+import project_management.bootstrap
+from project_management.bootstrap import bootstrap
+from project_management.users import check_user, create_user, get_users
+from project_management.projects import (calculate_project_progress, create_project, delete_project, get_project_overview,
+                                         get_projects)
+from project_management.tasks import (SEARCH_PAGE_SIZE, TASK_STATUSES, bulk_delete_tasks, bulk_reassign_tasks,
+                                      bulk_update_task_status, create_task, delete_task, get_matching_task_ids,
+                                      get_task_board, search_tasks, update_task_status)
+from project_management.comments import add_comment
+from project_management.notifications import (NOTIFICATION_FEED_LIMIT, get_notification_feed, get_notification_settings,
+                                              get_unread_count, get_user_notification_preferences, mark_notifications_read,
+                                              update_notification_settings, update_user_notification_preferences)
 
 # Set page config at the very beginning
 st.set_page_config(layout="wide",page_icon="assets/artwork.png",page_title="DIGIT ERP - PM TOOL")
@@ -31,290 +49,211 @@ st.set_page_config(layout="wide",page_icon="assets/artwork.png",page_title="DIGI
 # # Display the custom HTML
 # st.components.v1.html(custom_html)
 
-# Database connection
+
+# Startup, once per process: schema, notification settings and the initial admin (see bootstrap()),
+# then the background workers unless START_WORKERS is off. Every rerun gets the same report back,
+# so reruns only render.
 @st.cache_resource
-def init_connection():
-    return sqlite3.connect('project_management.db', check_same_thread=False)
-
-conn = init_connection()
-
-# Function to get a new cursor
-def get_cursor():
-    return conn.cursor()
-
-# Function to add columns if they don't exist
-def add_column_if_not_exists(table, column, type):
-    c = get_cursor()
-    c.execute(f"PRAGMA table_info({table})")
-    columns = [col[1] for col in c.fetchall()]
-    if column not in columns:
-        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type}")
-        conn.commit()
-
-# Create tables and add necessary columns
-def init_db():
-    c = get_cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT, is_admin INTEGER)''')
-    add_column_if_not_exists('users', 'email', 'TEXT')
-    add_column_if_not_exists('users', 'phone_number', 'TEXT')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS projects
-                 (id INTEGER PRIMARY KEY, name TEXT, description TEXT)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS tasks
-                 (id INTEGER PRIMARY KEY, project_id INTEGER, name TEXT, description TEXT, 
-                  assigned_to INTEGER, status TEXT, 
-                  FOREIGN KEY (project_id) REFERENCES projects(id),
-                  FOREIGN KEY (assigned_to) REFERENCES users(id))''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS comments
-                 (id INTEGER PRIMARY KEY, task_id INTEGER, user_id INTEGER, content TEXT, created_at TIMESTAMP,
-                  FOREIGN KEY (task_id) REFERENCES tasks(id),
-                  FOREIGN KEY (user_id) REFERENCES users(id))''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS notifications
-                 (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, created_at TIMESTAMP,
-                  FOREIGN KEY (user_id) REFERENCES users(id))''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS notification_settings
-                 (id INTEGER PRIMARY KEY, email INTEGER, in_app INTEGER, sms INTEGER)''')
-
-    conn.commit()
-
-# Initialize the database
-init_db()
-
-# Email configuration
-EMAIL_HOST = 'smtp.gmail.com'  # Replace with your SMTP server
-EMAIL_PORT = 587  # Replace with your SMTP port
-EMAIL_HOST_USER = 'your_email@gmail.com'  # Replace with your email
-EMAIL_HOST_PASSWORD = 'your_email_password'  # Replace with your email password
-
-# Helper functions
-def hash_password(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def check_user(username, password):
-    c = get_cursor()
-    c.execute('SELECT id, username, password, is_admin, email FROM users WHERE username=? AND password=?', (username, hash_password(password)))
-    return c.fetchone()
-
-def is_admin(user_id):
-    c = get_cursor()
-    c.execute('SELECT is_admin FROM users WHERE id=?', (user_id,))
-    return c.fetchone()[0] == 1
-
-def create_user(username, password, email, is_admin=0):
-    c = get_cursor()
-    try:
-        c.execute('INSERT INTO users (username, password, is_admin, email) VALUES (?, ?, ?, ?)',
-                  (username, hash_password(password), is_admin, email))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-
-def get_projects():
-    c = get_cursor()
-    c.execute('SELECT * FROM projects')
-    return c.fetchall()
-
-def create_project(name, description):
-    c = get_cursor()
-    c.execute('INSERT INTO projects (name, description) VALUES (?, ?)', (name, description))
-    conn.commit()
-
-def get_tasks(project_id, user_id):
-    c = get_cursor()
-    if is_admin(user_id):
-        c.execute('SELECT * FROM tasks WHERE project_id=?', (project_id,))
+def init_app():
+    startup = bootstrap()
+    if project_management.bootstrap.START_WORKERS:
+        # Deliver queued emails from a background thread
+        with startup.step('outbox worker'):
+            startup.outbox_worker = OutboxWorker(DB_PATH)
+            startup.outbox_worker.start()
+        # Apply notification/comment retention and compact the database on a schedule
+        with startup.step('maintenance worker'):
+            MaintenanceWorker(DB_PATH).start()
+    print(f"Startup took {startup.summary()}")
+    return startup
+
+startup = init_app()
+
+# Number of tasks rendered per page in the task list
+TASK_PAGE_SIZE = 25
+
+# Number of profiled reruns an admin's query profiler keeps
+QUERY_PROFILE_HISTORY = 20
+
+# How often the live sections (task list, project progress, notifications) check for changes.
+# A check is a lookup on the change bus; they only query again when something they show changed.
+LIVE_REFRESH_SECONDS = 5
+
+# Data for a live section: what it loaded before, unless this is a full rerun, key changed (project,
+# filters, page...) or a change to topic was published since; otherwise load() it again
+def live_data(name, key, topic, load):
+    version = change_bus.version(topic)
+    cached = st.session_state.get(name)
+    if (cached is not None and cached['key'] == key and cached['version'] == version
+            and cached['run'] == st.session_state.script_runs):
+        return cached['data']
+    data = load()
+    st.session_state[name] = {'key': key, 'version': version, 'run': st.session_state.script_runs, 'data': data}
+    return data
+
+# Task list actions run as widget callbacks, before the task list fragment reruns, so it shows the
+# change straight away without another rerun. The message is shown above the task list.
+# The board can be a few seconds behind, so the task may have been deleted in another session
+def post_comment(task_id, user_id):
+    if not add_comment(task_id, user_id, st.session_state[f'comment_input_{task_id}']):
+        st.session_state.task_error = 'This task has been deleted.'
+        return
+    st.session_state[f'comment_input_{task_id}'] = ''
+    st.session_state.task_message = 'Comment added successfully'
+
+def change_task_status(task_id, user_id):
+    if not update_task_status(task_id, st.session_state[f'status_select_{task_id}'], user_id):
+        st.session_state.task_error = 'This task has been deleted.'
+        return
+    st.session_state.task_message = 'Status updated successfully'
+
+def remove_task(task_id):
+    delete_task(task_id)
+    st.session_state.task_message = 'Task deleted successfully'
+
+def apply_bulk_action(project_id, user_id, status_filter, assignee_ids):
+    state = st.session_state
+    if state.bulk_all_matching:
+        task_ids = get_matching_task_ids(project_id, user_id, status_filter, assignee_ids)
     else:
-        c.execute('SELECT * FROM tasks WHERE project_id=? AND assigned_to=?', (project_id, user_id))
-    return c.fetchall()
-
-def create_task(project_id, name, description, assigned_to, notify_email, notify_in_app, notify_sms):
-    c = get_cursor()
-    c.execute('INSERT INTO tasks (project_id, name, description, assigned_to, status) VALUES (?, ?, ?, ?, ?)',
-              (project_id, name, description, assigned_to, 'New'))
-    conn.commit()
-    
-    # Send notifications based on selected options
-    c.execute('SELECT email, phone_number FROM users WHERE id=?', (assigned_to,))
-    result = c.fetchone()
-    user_email = result[0] if result else None
-    user_phone = result[1] if result and len(result) > 1 else None
-    
-    notification_message = f"New task assigned: {name}"
-    
-    if notify_email and user_email:
-        send_email_notification(user_email, "New Task Assigned", notification_message)
-    
-    if notify_in_app:
-        send_in_app_notification(assigned_to, notification_message)
-    
-    if notify_sms and user_phone:
-        send_sms_notification(user_phone, notification_message)
-
-def update_task_status(task_id, status, user_id):
-    c = get_cursor()
-    c.execute('UPDATE tasks SET status=? WHERE id=?', (status, task_id))
-    conn.commit()
-    
-    # Notify admin
-    c.execute('SELECT name FROM tasks WHERE id=?', (task_id,))
-    task_name = c.fetchone()[0]
-    c.execute('SELECT username FROM users WHERE id=?', (user_id,))
-    username = c.fetchone()[0]
-    notify_admin(f"Task '{task_name}' status updated to {status} by {username}")
-
-def update_task_description(task_id, description):
-    c = get_cursor()
-    c.execute('UPDATE tasks SET description=? WHERE id=?', (description, task_id))
-    conn.commit()
-
-def delete_task(task_id):
-    c = get_cursor()
-    c.execute('DELETE FROM tasks WHERE id=?', (task_id,))
-    c.execute('DELETE FROM comments WHERE task_id=?', (task_id,))
-    conn.commit()
-
-def get_users():
-    c = get_cursor()
-    c.execute('SELECT id, username FROM users WHERE is_admin=0')
-    return c.fetchall()
-
-def calculate_project_progress(project_id):
-    c = get_cursor()
-    c.execute('SELECT COUNT(*) FROM tasks WHERE project_id=?', (project_id,))
-    total_tasks = c.fetchone()[0]
-    c.execute('SELECT COUNT(*) FROM tasks WHERE project_id=? AND status IN ("Completed", "Closed")', (project_id,))
-    completed_tasks = c.fetchone()[0]
-    return completed_tasks / total_tasks if total_tasks > 0 else 0
-
-def add_comment(task_id, user_id, content):
-    c = get_cursor()
-    c.execute('INSERT INTO comments (task_id, user_id, content, created_at) VALUES (?, ?, ?, ?)',
-              (task_id, user_id, content, datetime.now()))
-    conn.commit()
-
-    # Notify admin
-    c.execute('SELECT name FROM tasks WHERE id=?', (task_id,))
-    task_name = c.fetchone()[0]
-    c.execute('SELECT username FROM users WHERE id=?', (user_id,))
-    username = c.fetchone()[0]
-    notify_admin(f"New comment on task '{task_name}' by {username}")
-
-def get_comments(task_id):
-    c = get_cursor()
-    c.execute('''SELECT comments.content, comments.created_at, users.username 
-                 FROM comments 
-                 JOIN users ON comments.user_id = users.id 
-                 WHERE comments.task_id=? 
-                 ORDER BY comments.created_at DESC''', (task_id,))
-    return c.fetchall()
-
-def send_email_notification(to_email, subject, body):
-    msg = MIMEMultipart()
-    msg['From'] = EMAIL_HOST_USER
-    msg['To'] = to_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-
-    try:
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_HOST_USER, to_email, text)
-        server.quit()
-        return True
-    except Exception as e:
-        st.error(f"Failed to send email: {str(e)}")
-        return False
-
-def send_in_app_notification(user_id, message):
-    c = get_cursor()
-    c.execute('INSERT INTO notifications (user_id, message, created_at) VALUES (?, ?, ?)',
-              (user_id, message, datetime.now()))
-    conn.commit()
-
-def send_sms_notification(phone_number, message):
-    # This is a placeholder for SMS sending logic
-    print(f"SMS notification sent to {phone_number}: {message}")
-
-def get_notifications(user_id):
-    c = get_cursor()
-    c.execute('SELECT message, created_at FROM notifications WHERE user_id=? ORDER BY created_at DESC', (user_id,))
-    return c.fetchall()
-
-def notify_admin(message):
-    c = get_cursor()
-    c.execute('SELECT id FROM users WHERE is_admin=1')
-    admin_ids = [row[0] for row in c.fetchall()]
-    for admin_id in admin_ids:
-        send_in_app_notification(admin_id, message)
-
-def get_notification_settings():
-    c = get_cursor()
-    c.execute('SELECT * FROM notification_settings LIMIT 1')
-    settings = c.fetchone()
-    if settings is None:
-        c.execute('INSERT INTO notification_settings (email, in_app, sms) VALUES (?, ?, ?)', (1, 1, 0))
-        conn.commit()
-        return {'email': True, 'in_app': True, 'sms': False}
-    return {'email': bool(settings[1]), 'in_app': bool(settings[2]), 'sms': bool(settings[3])}
-
-def update_notification_settings(email, in_app, sms):
-    c = get_cursor()
-    c.execute('UPDATE notification_settings SET email=?, in_app=?, sms=?', (int(email), int(in_app), int(sms)))
-    conn.commit()
-
-# Function to display tasks
+        task_ids = state.get('bulk_task_ids', [])
+    if not task_ids:
+        state.bulk_error = 'Select at least one task.'
+        return
+    if state.bulk_action == 'Change Status':
+        count = bulk_update_task_status(task_ids, state.bulk_status, user_id)
+        result = f'{count} of {len(task_ids)} tasks updated to {state.bulk_status}'
+        if state.bulk_status in ['Completed', 'Closed'] and count < len(task_ids):
+            result += ' (tasks without comments, or already in that status, were skipped)'
+    elif state.bulk_action == 'Reassign':
+        count = bulk_reassign_tasks(task_ids, state.bulk_assignee[0], user_id)
+        result = f'{count} of {len(task_ids)} tasks reassigned to {state.bulk_assignee[1]}'
+    else:
+        count = bulk_delete_tasks(task_ids, user_id)
+        result = f'{count} tasks deleted'
+    state.bulk_result = result
+    state.pop('bulk_task_ids', None)
+
+# Bulk status change / reassignment / deletion for a selection of tasks
+def display_bulk_actions(project_id, user_id, board, status_filter, assignee_ids):
+    if 'bulk_result' in st.session_state:
+        st.success(st.session_state.pop('bulk_result'))
+
+    with st.expander('Bulk Actions'):
+        apply_to_all = st.checkbox('Apply to every task matching the current filters', key='bulk_all_matching')
+        st.multiselect('Tasks on this page', list(board), format_func=lambda tid: board[tid]['task'][2],
+                       key='bulk_task_ids', disabled=apply_to_all)
+        action = st.radio('Action', ['Change Status', 'Reassign', 'Delete'], horizontal=True, key='bulk_action')
+        if action == 'Change Status':
+            st.selectbox('New Status', TASK_STATUSES, key='bulk_status')
+        elif action == 'Reassign':
+            st.selectbox('Assign To', get_users(), format_func=lambda x: x[1], key='bulk_assignee')
+
+        st.button('Apply', key='bulk_apply', on_click=apply_bulk_action,
+                  args=(project_id, user_id, status_filter, assignee_ids))
+        if 'bulk_error' in st.session_state:
+            st.error(st.session_state.pop('bulk_error'))
+
+# Download callable for the JSONL export of one project (or all when None). Streamlit calls it on
+# its own thread when the button is clicked, so it reads through a connection of its own.
+def export_file(project_id):
+    def export():
+        with closing(connect(DB_PATH)) as conn, tempfile.TemporaryFile() as f:
+            out = io.TextIOWrapper(f, encoding='utf-8')
+            export_jsonl(conn, out, project_id)
+            out.flush()
+            f.seek(0)
+            return f.read()
+    return export
+
+# Admin debug panel: statements, rows, time and commits of the recent reruns of this session
+def display_query_profiler(profiles):
+    st.divider()
+    st.subheader('Query Profiler')
+    # Choosing by label keeps a picked rerun selected while newer ones arrive
+    profiles_by_label = {p.label: p for p in profiles}
+    choice = st.selectbox('Rerun', ['Latest rerun'] + list(reversed(profiles_by_label)), key='query_profile_select')
+    profile = profiles_by_label.get(choice, profiles[-1])
+    summary = profile.summary()
+    statements_column, rows_column, time_column, commits_column = st.columns(4)
+    statements_column.metric('Statements', summary['statements'])
+    rows_column.metric('Rows', summary['rows'])
+    time_column.metric('SQL time', f"{summary['ms']:.1f} ms")
+    commits_column.metric('Commits', summary['commits'])
+
+    st.write('**By function**')
+    st.dataframe([{'function': function, **totals} for function, totals in
+                  sorted(profile.by_function.items(), key=lambda item: item[1]['ms'], reverse=True)])
+    repeated = profile.repeated()
+    if repeated:
+        st.write('**Repeated statements** (the same SQL run more than once by one function, e.g. a query per task)')
+        st.dataframe(repeated)
+    with st.expander(f'Statement log ({len(profile.statements)} statements)'):
+        if profile.dropped:
+            st.caption(f'{profile.dropped} further statements were counted but not logged')
+        st.dataframe(profile.statements)
+    st.download_button('Download as JSON', json.dumps([p.to_dict() for p in profiles], indent=2, default=str),
+                       file_name='query_profiles.json', mime='application/json', key='download_query_profiles')
+
+# Live section: reruns on its own every LIVE_REFRESH_SECONDS and reloads the page of tasks only
+# when a change to the project is published (by this session or any other)
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
 def display_tasks(project_id, user_id, user_is_admin):
     st.subheader('Tasks')
+    if 'task_message' in st.session_state:
+        st.success(st.session_state.pop('task_message'))
+    if 'task_error' in st.session_state:
+        st.error(st.session_state.pop('task_error'))
     
     # Filters
-    status_filter = st.multiselect('Filter by Status', ['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened', 'Closed'], key='status_filter')
-    assignee_filter = st.multiselect('Filter by Assignee', [user[1] for user in get_users()], key='assignee_filter')
+    status_filter = st.multiselect('Filter by Status', TASK_STATUSES, key='status_filter')
+    user_ids_by_name = {username: uid for uid, username in get_users()}
+    assignee_filter = st.multiselect('Filter by Assignee', list(user_ids_by_name), key='assignee_filter')
+    assignee_ids = [user_ids_by_name[name] for name in assignee_filter]
+
+    # Keyset paging: one cursor per visited page, reset whenever the project or filters change
+    page_key = (project_id, tuple(status_filter), tuple(assignee_ids))
+    if st.session_state.get('task_page_key') != page_key:
+        st.session_state.task_page_key = page_key
+        st.session_state.task_page_cursors = [None]
+    page_cursors = st.session_state.task_page_cursors
+
+    board, next_after_id = live_data('task_board', (user_id, page_key, page_cursors[-1]), ('project', project_id),
+                                     lambda: get_task_board(project_id, user_id, status_filter, assignee_ids,
+                                                            after_id=page_cursors[-1], limit=TASK_PAGE_SIZE))
+    filtered_tasks = list(board.values())
 
-    tasks = get_tasks(project_id, user_id)
-    filtered_tasks = [task for task in tasks if 
-                      (not status_filter or task[5] in status_filter) and
-                      (not assignee_filter or task[4] in [user[0] for user in get_users() if user[1] in assignee_filter])]
+    if user_is_admin:
+        display_bulk_actions(project_id, user_id, board, status_filter, assignee_ids)
 
-    for index, task in enumerate(filtered_tasks):
-        task_id, _, task_name, task_description, assigned_to, status = task
+    for index, entry in enumerate(filtered_tasks):
+        task_id, _, task_name, task_description, assigned_to, status = entry['task']
         with st.expander(f'{task_name} (Status: {status})'):
-            st.write(f'**Assigned to:** {assigned_to}')
+            st.write(f'**Assigned to:** {entry["assignee"] or assigned_to}')
             
             st.write('**Description:**')
             st.write(task_description)
             
             st.write('**Comments:**')
-            comments = get_comments(task_id)
+            comments = entry['comments']
             for comment in comments:
                 st.text(f"{comment[2]} ({comment[1]}): {comment[0]}")
             
             if status != 'Closed' or user_is_admin:
-                new_comment = st.text_area('Add a comment', key=f'comment_input_{task_id}')
-                if st.button('Post Comment', key=f'post_comment_{task_id}'):
-                    add_comment(task_id, user_id, new_comment)
-                    st.success('Comment added successfully')
-                    st.rerun()
+                st.text_area('Add a comment', key=f'comment_input_{task_id}')
+                st.button('Post Comment', key=f'post_comment_{task_id}', on_click=post_comment, args=(task_id, user_id))
             
             if user_is_admin:
                 new_status = st.selectbox('Update Status', 
-                                          ['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened', 'Closed'],
-                                          index=['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened', 'Closed'].index(status),
+                                          TASK_STATUSES,
+                                          index=TASK_STATUSES.index(status),
                                           key=f'status_select_{task_id}')
                 if new_status != status:
                     if new_status in ['Completed', 'Closed'] and not comments:
                         st.error('Please add a comment before marking the task as Completed or Closed.')
-                    elif st.button('Update Status', key=f'update_status_{task_id}'):
-                        update_task_status(task_id, new_status, user_id)
-                        st.success('Status updated successfully')                        
-                        st.rerun()
+                    else:
+                        st.button('Update Status', key=f'update_status_{task_id}', on_click=change_task_status,
+                                  args=(task_id, user_id))
             elif user_id == assigned_to and status != 'Closed':
                 new_status = st.selectbox('Update Status', 
                                           ['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened'],
@@ -323,18 +262,60 @@ def display_tasks(project_id, user_id, user_is_admin):
                 if new_status != status:
                     if new_status == 'Completed' and not comments:
                         st.error('Please add a comment before marking the task as Completed.')
-                    elif st.button('Update Status', key=f'update_status_{task_id}'):
-                        update_task_status(task_id, new_status, user_id)
-                        st.success('Status updated successfully')
-                        st.rerun()
+                    else:
+                        st.button('Update Status', key=f'update_status_{task_id}', on_click=change_task_status,
+                                  args=(task_id, user_id))
             else:
                 st.write(f'**Current Status:** {status}')
             
             if user_is_admin:
-                if st.button('Delete Task', key=f'delete_task_{task_id}'):
-                    delete_task(task_id)
-                    st.success('Task deleted successfully')
-                    st.rerun()
+                st.button('Delete Task', key=f'delete_task_{task_id}', on_click=remove_task, args=(task_id,))
+
+    prev_column, page_column, next_column = st.columns(3)
+    if len(page_cursors) > 1:
+        prev_column.button('Previous Page', key='task_page_prev', on_click=page_cursors.pop)
+    page_column.write(f'Page {len(page_cursors)}')
+    if next_after_id is not None:
+        next_column.button('Next Page', key='task_page_next', on_click=page_cursors.append, args=(next_after_id,))
+
+# Live section: the selected project's progress bar
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def display_project_progress(project_id):
+    progress = live_data('project_progress', project_id, ('project', project_id),
+                         lambda: calculate_project_progress(project_id))
+    st.progress(progress)
+    st.write(f'Progress: {progress:.0%}')
+
+def mark_feed_read(user_id):
+    feed = st.session_state.notification_feed
+    mark_notifications_read(user_id, feed['last_id'])
+    feed['rows'] = [(notification_id, message, created_at, 1) for notification_id, message, created_at, _ in feed['rows']]
+
+# Live section for the sidebar: the notification feed, refreshed when one arrives for this user.
+# The feed is kept in session state and only rows newer than the last one shown are fetched.
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def display_notifications(user_id):
+    feed = st.session_state.get('notification_feed')
+    if feed is None or feed['user_id'] != user_id:
+        feed = st.session_state.notification_feed = {'user_id': user_id, 'last_id': None, 'rows': [], 'unread': 0,
+                                                     'version': None, 'run': None}
+    version = change_bus.version(('user', user_id))
+    if feed['version'] != version or feed['run'] != st.session_state.script_runs:
+        feed['version'], feed['run'] = version, st.session_state.script_runs
+        new_notifications = get_notification_feed(user_id, after_id=feed['last_id'])
+        if new_notifications:
+            feed['rows'] = (new_notifications + feed['rows'])[:NOTIFICATION_FEED_LIMIT]
+            feed['last_id'] = new_notifications[0][0]
+        feed['unread'] = get_unread_count(user_id)
+
+    st.header(f"Notifications ({feed['unread']} unread)" if feed['unread'] else 'Notifications')
+    if feed['unread']:
+        st.button('Mark all as read', key='mark_notifications_read', on_click=mark_feed_read, args=(user_id,))
+    for notification_id, message, created_at, is_read in feed['rows']:
+        if is_read:
+            st.write(f'[{created_at}] {message}')
+        else:
+            st.write(f'**[{created_at}] {message}**')
 
 # Streamlit UI
 # st.image("assets/artwork.png", width=150)
@@ -346,6 +327,19 @@ if 'user' not in st.session_state:
 if 'view' not in st.session_state:
     st.session_state.view = None
 
+# Full reruns of this session; live sections reload their data on every full rerun (see live_data)
+st.session_state.script_runs = st.session_state.get('script_runs', 0) + 1
+
+# Record every statement of this rerun when an admin has the query profiler switched on
+query_profiles = None
+if st.session_state.user and st.session_state.user['is_admin'] and st.session_state.get('profile_queries'):
+    query_profiles = st.session_state.setdefault('query_profiles', deque(maxlen=QUERY_PROFILE_HISTORY))
+    st.session_state.query_run = st.session_state.get('query_run', 0) + 1
+    query_profiles.append(RunProfile(f"Rerun {st.session_state.query_run} at {datetime.now():%H:%M:%S}"))
+    get_connection().profile = query_profiles[-1]
+else:
+    get_connection().profile = None
+
 # Sidebar for login and logout
 sidebar = st.sidebar
 
@@ -355,18 +349,22 @@ if st.session_state.user is None:
     username = sidebar.text_input('Username')
     password = sidebar.text_input('Password', type='password')
     if sidebar.button('Login'):
-        user = check_user(username, password)
-        if user:
-            st.session_state.user = {
-                'id': user[0],
-                'username': user[1],
-                'is_admin': user[3],
-                'email': user[4]
-            }
-            st.success('Logged in successfully')
-            st.rerun()
+        try:
+            user = check_user(username, password, getattr(st.context, 'ip_address', None))
+        except LoginThrottled as e:
+            st.error(str(e))
         else:
-            st.error('Invalid username or password')
+            if user:
+                st.session_state.user = {
+                    'id': user[0],
+                    'username': user[1],
+                    'is_admin': user[3],
+                    'email': user[4]
+                }
+                st.success('Logged in successfully')
+                st.rerun()
+            else:
+                st.error('Invalid username or password')
 else:
     if sidebar.button('Logout'):
         st.session_state.user = None
@@ -382,18 +380,37 @@ if st.session_state.user:
     
     sidebar.write(f'Welcome, {username}!')
 
-    # Get current notification settings
+    # Get current notification settings (held in memory, no query)
     notification_settings = get_notification_settings()
 
+    with sidebar.expander('My Notification Preferences'):
+        preferences = get_user_notification_preferences(user_id)
+        my_email = st.checkbox('Email', value=preferences['email'], key='my_notify_email')
+        my_in_app = st.checkbox('In-App', value=preferences['in_app'], key='my_notify_in_app')
+        my_sms = st.checkbox('SMS', value=preferences['sms'], key='my_notify_sms')
+        if st.button('Save Preferences', key='save_my_notify'):
+            update_user_notification_preferences(user_id, my_email, my_in_app, my_sms)
+            st.success('Preferences saved')
+
     # Admin-only section
     if user_is_admin:
         admin_action = sidebar.selectbox(
             "Admin Actions",
-            ["None", "Manage Projects", "Create User", "Notification Settings"],
+            ["None", "Manage Projects", "Projects Overview", "Import / Export", "Create User", "Notification Settings"],
             key="admin_action"
         )
         if admin_action != "None":
             st.session_state.view = "admin"
+        cache_stats = read_cache.stats()
+        sidebar.caption(f"Read cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                        f"({cache_stats['hit_ratio']:.0%} hit rate)")
+        if startup.outbox_worker is not None:
+            smtp_stats = startup.outbox_worker.pool.stats()
+            sidebar.caption(f"SMTP: {smtp_stats['messages_sent']} sent, {smtp_stats['send_failures']} failed over "
+                            f"{smtp_stats['connections_opened']} connections "
+                            f"({smtp_stats['connections_reused']} reuses, {smtp_stats['idle_connections']} idle)")
+        sidebar.caption(f"Startup: {startup.summary()}")
+        sidebar.toggle('Profile queries', key='profile_queries')
         
     # Project selection (for all users)
     sidebar.header('Projects')
@@ -405,6 +422,11 @@ if st.session_state.user:
     if selected_project_name != "Select a project":
         st.session_state.view = "project"
 
+    # Search across all projects
+    search_query = sidebar.text_input('Search tasks and comments', key='search_query').strip()
+    if search_query:
+        st.session_state.view = "search"
+
     # Main content area
     if st.session_state.view == "admin":
         if admin_action == "Manage Projects":
@@ -428,16 +450,67 @@ if st.session_state.user:
                 for project in projects:
                     st.write(f"- {project[1]}")
 
+                if projects:
+                    st.subheader("Delete Project")
+                    project_to_delete = st.selectbox("Project", projects, format_func=lambda p: p[1],
+                                                     key="delete_project_select")
+                    confirm_delete = st.checkbox("I understand this deletes all of the project's tasks and comments",
+                                                 key="confirm_delete_project")
+                    if st.button("Delete Project", key="delete_project_button", disabled=not confirm_delete):
+                        delete_project(project_to_delete[0], user_id)
+                        st.success(f"Project '{project_to_delete[1]}' deleted")
+                        st.rerun()
+
+        elif admin_action == "Projects Overview":
+            st.subheader("Projects Overview")
+            for _, name, total_tasks, completed_tasks, progress in get_project_overview():
+                st.progress(progress, text=f"{name}: {completed_tasks}/{total_tasks} tasks done ({progress:.0%})")
+
+        elif admin_action == "Import / Export":
+            export_tab, import_tab = st.tabs(["Export", "Import"])
+
+            with export_tab:
+                st.subheader("Export Projects")
+                export_choice = st.selectbox("Project", [None] + get_projects(),
+                                             format_func=lambda p: "All projects" if p is None else p[1],
+                                             key="export_project_select")
+                # Generated only when the button is clicked: rows stream into a temporary file on disk
+                # and are handed to Streamlit once, instead of being kept in the session
+                st.download_button("Download JSONL", export_file(export_choice[0] if export_choice else None),
+                                   file_name="projects_export.jsonl", mime="application/x-ndjson",
+                                   key="download_export")
+
+            with import_tab:
+                st.subheader("Import Projects")
+                uploaded = st.file_uploader("JSONL export file", type=["jsonl"], key="import_file")
+                if uploaded is not None and st.button("Import", key="run_import"):
+                    try:
+                        counts = import_rows(get_connection(),
+                                             read_jsonl(io.TextIOWrapper(uploaded, encoding='utf-8')))
+                    except KeyError as e:
+                        st.error(f"Import failed, nothing was imported: a row has no {e} field")
+                    except (ValueError, sqlite3.Error) as e:
+                        st.error(f"Import failed, nothing was imported: {e}")
+                    else:
+                        get_projects.invalidate()
+                        st.success(f"Imported {counts['projects']} projects, {counts['tasks']} tasks and "
+                                   f"{counts['comments']} comments ({counts['skipped']} rows skipped)")
+
         elif admin_action == "Create User":
             st.subheader("Create New User")
             new_username = st.text_input('New Username')
             new_password = st.text_input('New Password', type='password')
             new_email = st.text_input('Email')
             if st.button('Create User'):
-                if create_user(new_username, new_password, new_email):
-                    st.success('User created successfully')
+                try:
+                    created = create_user(new_username, new_password, new_email)
+                except CredentialsBusy as e:
+                    st.error(str(e))
                 else:
-                    st.error('Username already exists')
+                    if created:
+                        st.success('User created successfully')
+                    else:
+                        st.error('Username already exists')
 
         elif admin_action == "Notification Settings":
             st.subheader('Notification Settings')
@@ -449,6 +522,28 @@ if st.session_state.user:
                 st.success('Notification settings updated successfully')
                 st.rerun()
 
+    elif st.session_state.view == "search" and search_query:
+        st.subheader(f'Search results for "{search_query}"')
+        if st.session_state.get('search_page_key') != search_query:
+            st.session_state.search_page_key = search_query
+            st.session_state.search_page = 0
+        search_page = st.session_state.search_page
+
+        results = search_tasks(search_query, user_id, limit=SEARCH_PAGE_SIZE + 1, offset=search_page * SEARCH_PAGE_SIZE)
+        if not results:
+            st.info('No matching tasks or comments.')
+        for kind, _, _, result_project_name, result_task_name, snippet in results[:SEARCH_PAGE_SIZE]:
+            st.markdown(f'**{result_project_name} / {result_task_name}** ({kind})  \n{snippet}')
+
+        prev_column, page_column, next_column = st.columns(3)
+        if search_page > 0 and prev_column.button('Previous Page', key='search_page_prev'):
+            st.session_state.search_page -= 1
+            st.rerun()
+        page_column.write(f'Page {search_page + 1}')
+        if len(results) > SEARCH_PAGE_SIZE and next_column.button('Next Page', key='search_page_next'):
+            st.session_state.search_page += 1
+            st.rerun()
+
     elif st.session_state.view == "project":
         if selected_project_name != "Select a project":
             try:
@@ -457,9 +552,7 @@ if st.session_state.user:
                 
                 st.header(project_name)
                 st.write(project_description)
-                progress = calculate_project_progress(project_id)
-                st.progress(progress)   
-                st.write(f'Progress: {progress:.0%}')
+                display_project_progress(project_id)
 
                 if user_is_admin:
                     # Admin view
@@ -539,18 +632,17 @@ if st.session_state.user:
     else:
         st.info("Please select a project from the sidebar or an admin action to view details.")
 
-    # Notifications
-    sidebar.header('Notifications')
-    notifications = get_notifications(user_id)
-    for i, (message, created_at) in enumerate(notifications):
-        sidebar.write(f'[{created_at}] {message}')
+    with sidebar:
+        display_notifications(user_id)
 
 else:
     st.write("Please log in to access the application.")
 
-# Create initial admin user if not exists
-c = get_cursor()
-c.execute('SELECT * FROM users WHERE is_admin=1')
-if not c.fetchone():
-    create_user('admin', 'admin123', 'admin@example.com', is_admin=1)
-    st.info('Initial admin user created. Username: admin, Password: admin123, Email: admin@example.com')
\ No newline at end of file
+# Announce the initial admin user created at startup, once
+if startup.admin_created and not startup.admin_announced:
+    startup.admin_announced = True
+    st.info('Initial admin user created. Username: admin, Password: admin123, Email: admin@example.com')
+
+# Shown last so that the profile covers the whole rerun
+if query_profiles:
+    display_query_profiler(query_profiles)
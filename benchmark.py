@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import streamlit as st
+import project_management.bootstrap
+from project_management import comments, connection, notifications, projects, tasks, users
+from timing import percentile
+
+# Data-layer benchmarks: build a synthetic database of configurable size against the real
+# schema, then time app's data functions and a simulated rerun of the project page.
+# Results can be saved with --json and compared against an earlier run with --baseline.
+
+STATUSES = ['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened', 'Closed']
+
+# Counts the statements executed on a connection while installed. SQLite reports BEGIN/COMMIT and the
+# statements it runs for triggers and FTS5 lookups too, so the count tracks work done, not calls made.
+class QueryCounter:
+    def __init__(self, conn):
+        self.conn = conn
+        self.count = 0
+
+    def trace(self, statement):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        self.conn.set_trace_callback(self.trace)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_trace_callback(None)
+
+def build_fixture(project_count, task_count, comment_count, user_count, notification_count, seed):
+    rng = random.Random(seed)
+    password = users.hash_password('benchmark')
+    start = datetime.now() - timedelta(days=30)  # Recent enough that the retention job leaves it alone
+    with connection.transaction() as c:
+        c.executemany('INSERT INTO users (username, password, is_admin, email) VALUES (?, ?, 0, ?)',
+                      [(f'user{i}', password, f'user{i}@example.com') for i in range(user_count)])
+        c.execute('SELECT id FROM users WHERE is_admin=0 ORDER BY id')
+        user_ids = [row[0] for row in c.fetchall()]
+        for p in range(project_count):
+            c.execute('INSERT INTO projects (name, description) VALUES (?, ?)',
+                      (f'Project {p}', f'Synthetic project {p}'))
+            project_id = c.lastrowid
+            c.executemany('''INSERT INTO tasks (project_id, name, description, description_text, assigned_to, status)
+                             VALUES (?, ?, ?, ?, ?, ?)''',
+                          [(project_id, f'Task {p}-{t}', f'<p>Synthetic task {t} of project {p}</p>',
+                            f'Synthetic task {t} of project {p}', rng.choice(user_ids), rng.choice(STATUSES))
+                           for t in range(task_count)])
+        c.execute('SELECT id FROM tasks ORDER BY id')
+        task_ids = [row[0] for row in c.fetchall()]
+        c.executemany('INSERT INTO comments (task_id, user_id, content, created_at) VALUES (?, ?, ?, ?)',
+                      ((task_id, rng.choice(user_ids), f'Comment {n} on task {task_id}',
+                        start + timedelta(seconds=task_id * comment_count + n))
+                       for task_id in task_ids for n in range(comment_count)))
+        c.execute('SELECT id FROM users ORDER BY id')
+        c.executemany('INSERT INTO notifications (user_id, message, created_at, is_read, task_id) VALUES (?, ?, ?, ?, ?)',
+                      ((user_id, f'Notification {n}', start + timedelta(minutes=n), rng.random() < 0.7,
+                        rng.choice(task_ids) if task_ids else None)
+                       for (user_id,) in c.fetchall() for n in range(notification_count)))
+    connection.read_cache.clear()
+
+def table_counts():
+    c = connection.get_cursor()
+    counts = {}
+    for table in ('projects', 'tasks', 'comments', 'users', 'notifications'):
+        c.execute(f'SELECT COUNT(*) FROM {table}')
+        counts[table] = c.fetchone()[0]
+    return counts
+
+# One rerun of the project page as the main script makes it, with a fresh notification feed.
+# Widgets run in bare mode and return their defaults, so this measures the data work, not rendering.
+# Fragments do not run in bare mode, so their functions are called undecorated (__wrapped__).
+def simulated_rerun(app, project_id, user_id, user_is_admin):
+    st.session_state.clear()
+    st.session_state.script_runs = 1
+    notifications.get_notification_settings()
+    notifications.get_user_notification_preferences(user_id)
+    projects.get_projects()
+    app.display_project_progress.__wrapped__(project_id)
+    if user_is_admin:
+        users.get_users()
+    app.display_tasks.__wrapped__(project_id, user_id, user_is_admin)
+    app.display_notifications.__wrapped__(user_id)
+
+# The task list as a full rerun draws it, reloading its data
+def full_display_tasks(app, project_id, user_id, user_is_admin):
+    st.session_state.script_runs = st.session_state.get('script_runs', 0) + 1
+    app.display_tasks.__wrapped__(project_id, user_id, user_is_admin)
+
+# One run_every tick of the project page's live sections between full reruns; with changed, another
+# session has just changed the project
+def live_refresh(app, project_id, user_id, user_is_admin, changed):
+    if changed:
+        connection.change_bus.publish(('project', project_id))
+    app.display_project_progress.__wrapped__(project_id)
+    app.display_tasks.__wrapped__(project_id, user_id, user_is_admin)
+    app.display_notifications.__wrapped__(user_id)
+
+def benchmarks(app, project_id, admin_id, member_id, task_id):
+    return [
+        ('get_projects', lambda: projects.get_projects()),
+        ('get_users', lambda: users.get_users()),
+        ('get_tasks (admin, all)', lambda: tasks.get_tasks(project_id, admin_id)),
+        ('get_tasks (member, all)', lambda: tasks.get_tasks(project_id, member_id)),
+        ('get_tasks (admin, page)', lambda: tasks.get_tasks(project_id, admin_id, limit=app.TASK_PAGE_SIZE)),
+        ('get_task_board (page)', lambda: tasks.get_task_board(project_id, admin_id, limit=app.TASK_PAGE_SIZE)),
+        ('get_comments', lambda: comments.get_comments(task_id)),
+        ('calculate_project_progress', lambda: projects.calculate_project_progress(project_id)),
+        ('get_project_overview', lambda: projects.get_project_overview()),
+        ('get_notification_feed', lambda: notifications.get_notification_feed(member_id)),
+        ('get_unread_count', lambda: notifications.get_unread_count(member_id)),
+        ('search_tasks', lambda: tasks.search_tasks('synthetic task', admin_id)),
+        ('display_tasks (admin)', lambda: full_display_tasks(app, project_id, admin_id, True)),
+        ('display_tasks (member)', lambda: full_display_tasks(app, project_id, member_id, False)),
+        ('rerun (admin)', lambda: simulated_rerun(app, project_id, admin_id, True)),
+        ('rerun (member)', lambda: simulated_rerun(app, project_id, member_id, False)),
+        ('live refresh (no change)', lambda: live_refresh(app, project_id, member_id, False, False)),
+        ('live refresh (changed)', lambda: live_refresh(app, project_id, member_id, False, True)),
+    ]
+
+def summarize(timings, queries):
+    return {
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'max_ms': max(timings) * 1000,
+        'queries': max(queries),
+    }
+
+def run_benchmark(func, repeat, warm_cache):
+    func()  # Warm up SQLite's page cache and statement cache
+    timings, queries = [], []
+    for _ in range(repeat):
+        if not warm_cache:
+            connection.read_cache.clear()
+        with QueryCounter(connection.get_connection()) as counter:
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        queries.append(counter.count)
+    return summarize(timings, queries)
+
+# Cold start, measured in a fresh process on the fixture database: 'bootstrap' is the run-once
+# startup stage alone, 'app' the first run of the whole script (bootstrap, workers and the login page).
+# Streamlit itself is imported before the clock starts. Prints seconds and statement count as JSON.
+COLD_START_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {directory!r})
+import streamlit
+from project_management import connection
+from project_management.bootstrap import bootstrap
+count = 0
+def trace(statement):
+    global count
+    count += 1
+start = time.perf_counter()
+connection.get_connection().set_trace_callback(trace)
+if {stage!r} == 'app':
+    import app
+else:
+    bootstrap()
+print(json.dumps([time.perf_counter() - start, count]))
+'''
+
+def run_cold_start(stage, runs):
+    timings, queries = [], []
+    script = COLD_START_SCRIPT.format(directory=os.path.dirname(os.path.abspath(__file__)), stage=stage)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        seconds, count = json.loads(output.strip().splitlines()[-1])
+        timings.append(seconds)
+        queries.append(count)
+    return summarize(timings, queries)
+
+def change(current, previous):
+    if not previous:
+        return ''
+    return f'{(current - previous) / previous:+7.1%}'
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the data functions on a synthetic database')
+    parser.add_argument('--projects', type=int, default=5)
+    parser.add_argument('--tasks', type=int, default=2000, help='Tasks per project')
+    parser.add_argument('--comments', type=int, default=5, help='Comments per task')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--notifications', type=int, default=200, help='Notifications per user')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed calls per benchmark')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', help='Directory holding the fixture database; an existing one is reused')
+    parser.add_argument('--warm-cache', action='store_true', help='Keep the shared read cache between calls')
+    parser.add_argument('--cold-starts', type=int, default=5, help='Fresh processes started to time startup (0 to skip)')
+    parser.add_argument('--only', help='Run only benchmarks whose name contains this text')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Compare against results written earlier with --json')
+    args = parser.parse_args()
+
+    # The data layer uses a relative database path, so run in the fixture directory.
+    # app is imported (in bare mode) for display_tasks, without its background workers: they would
+    # send the fixture's queued emails and run retention against it while it is being timed.
+    workdir = args.workdir or tempfile.mkdtemp()
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    reuse = os.path.exists('project_management.db')
+    project_management.bootstrap.START_WORKERS = False
+    import app
+
+    if not reuse:
+        start = time.perf_counter()
+        build_fixture(args.projects, args.tasks, args.comments, args.users, args.notifications, args.seed)
+        print(f"Built fixture in {time.perf_counter() - start:.1f}s")
+    counts = table_counts()
+    print(f"Database {os.path.abspath('project_management.db')}: "
+          + ', '.join(f'{count} {table}' for table, count in counts.items()))
+
+    c = connection.get_cursor()
+    c.execute('SELECT id FROM users WHERE is_admin=1 ORDER BY id LIMIT 1')
+    admin_id = c.fetchone()[0]
+    c.execute('''SELECT project_id, assigned_to FROM tasks WHERE assigned_to IS NOT NULL
+                 GROUP BY project_id, assigned_to ORDER BY COUNT(*) DESC LIMIT 1''')
+    row = c.fetchone()
+    if row is None:
+        print("The fixture has no assigned tasks to benchmark")
+        return 1
+    project_id, member_id = row
+    c.execute('''SELECT task_id FROM comments JOIN tasks ON tasks.id = comments.task_id
+                 WHERE tasks.project_id=? GROUP BY task_id ORDER BY COUNT(*) DESC LIMIT 1''', (project_id,))
+    row = c.fetchone()
+    task_id = row[0] if row else None
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print(f"{'benchmark':28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'queries':>8}"
+          + ('  p50 vs baseline' if baseline else ''))
+    measurements = [(name, lambda func=func: run_benchmark(func, args.repeat, args.warm_cache))
+                    for name, func in benchmarks(app, project_id, admin_id, member_id, task_id)]
+    if args.cold_starts:
+        measurements += [(f'cold start ({stage})', lambda stage=stage: run_cold_start(stage, args.cold_starts))
+                         for stage in ('bootstrap', 'app')]
+    for name, measure in measurements:
+        if args.only and args.only not in name:
+            continue
+        result = results[name] = measure()
+        previous = baseline.get(name, {})
+        print(f"{name:28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+              f"{result['max_ms']:9.2f} {result['queries']:8d}"
+              + (f"  {change(result['p50_ms'], previous.get('p50_ms'))}" if baseline else '')
+              + (f"  queries was {previous['queries']}" if previous and previous['queries'] != result['queries'] else ''))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'counts': counts, 'repeat': args.repeat, 'warm_cache': args.warm_cache, 'results': results},
+                      f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
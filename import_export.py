@@ -0,0 +1,200 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from project_management.text_search import strip_html
+
+# Tables in dependency order; each export row carries usernames instead of user ids so that
+# projects can be moved between databases whose users have different ids.
+TABLES = ['projects', 'tasks', 'comments']
+
+COLUMNS = {
+    'projects': ['id', 'name', 'description'],
+    'tasks': ['id', 'project_id', 'name', 'description', 'status', 'assignee'],
+    'comments': ['id', 'task_id', 'username', 'content', 'created_at'],
+}
+
+EXPORT_QUERIES = {
+    'projects': 'SELECT id, name, description FROM projects {where} ORDER BY id',
+    'tasks': '''SELECT tasks.id, tasks.project_id, tasks.name, tasks.description, tasks.status, users.username
+                FROM tasks LEFT JOIN users ON users.id = tasks.assigned_to
+                {where} ORDER BY tasks.id''',
+    'comments': '''SELECT comments.id, comments.task_id, users.username, comments.content, comments.created_at
+                   FROM comments
+                   JOIN tasks ON tasks.id = comments.task_id
+                   LEFT JOIN users ON users.id = comments.user_id
+                   {where} ORDER BY comments.id''',
+}
+
+PROJECT_FILTERS = {
+    'projects': 'WHERE id=?',
+    'tasks': 'WHERE tasks.project_id=?',
+    'comments': 'WHERE tasks.project_id=?',
+}
+
+INSERTS = {
+    'projects': 'INSERT INTO projects (id, name, description) VALUES (?, ?, ?)',
+    'tasks': '''INSERT INTO tasks (id, project_id, name, description, description_text, assigned_to, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)''',
+    'comments': 'INSERT INTO comments (id, task_id, user_id, content, created_at) VALUES (?, ?, ?, ?, ?)',
+}
+
+IMPORT_CHUNK_SIZE = 5000  # Rows per executemany call
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+# Yield (table, row dict) for every exported row, streaming from the cursor
+def iter_export(conn, project_id=None):
+    for table in TABLES:
+        c = conn.cursor()
+        if project_id is None:
+            c.execute(EXPORT_QUERIES[table].format(where=''))
+        else:
+            c.execute(EXPORT_QUERIES[table].format(where=PROJECT_FILTERS[table]), (project_id,))
+        for row in c:
+            yield table, dict(zip(COLUMNS[table], row))
+
+def export_jsonl(conn, out, project_id=None):
+    counts = dict.fromkeys(TABLES, 0)
+    for table, row in iter_export(conn, project_id):
+        out.write(json.dumps({'table': table, **row}, default=str) + '\n')
+        counts[table] += 1
+    return counts
+
+# One <table>.csv file per table in directory
+def export_csv(conn, directory, project_id=None):
+    os.makedirs(directory, exist_ok=True)
+    counts = dict.fromkeys(TABLES, 0)
+    files = {table: open(os.path.join(directory, f'{table}.csv'), 'w', newline='', encoding='utf-8') for table in TABLES}
+    try:
+        writers = {table: csv.DictWriter(files[table], COLUMNS[table]) for table in TABLES}
+        for writer in writers.values():
+            writer.writeheader()
+        for table, row in iter_export(conn, project_id):
+            writers[table].writerow(row)
+            counts[table] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
+
+# Raises ValueError naming the line for anything that is not a JSON object with a "table" field
+def read_jsonl(lines):
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+            if not isinstance(row, dict) or 'table' not in row:
+                raise ValueError(f'Line {number} is not an exported row (no "table" field)')
+            yield row.pop('table'), row
+
+def read_csv(directory):
+    for table in TABLES:
+        path = os.path.join(directory, f'{table}.csv')
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    yield table, row
+
+def optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+# Insert exported rows under fresh ids in a single transaction, using chunked executemany.
+# Parent ids are remapped as rows arrive, so records must come in TABLES order. Rows whose
+# parent is not part of the import are skipped. No notifications are sent.
+def import_rows(conn, records, chunk_size=IMPORT_CHUNK_SIZE):
+    c = conn.cursor()
+    c.execute('BEGIN IMMEDIATE')
+    try:
+        c.execute('SELECT username, id FROM users')
+        user_ids = dict(c.fetchall())
+        next_ids = {}
+        for table in TABLES:
+            c.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+            next_ids[table] = c.fetchone()[0]
+        id_maps = {table: {} for table in TABLES}
+        pending = {table: [] for table in TABLES}
+        counts = dict.fromkeys(TABLES + ['skipped'], 0)
+
+        # Parents are flushed first so their rows exist before any child references them
+        def flush(table):
+            for parent in TABLES[:TABLES.index(table) + 1]:
+                if pending[parent]:
+                    c.executemany(INSERTS[parent], pending[parent])
+                    counts[parent] += len(pending[parent])
+                    pending[parent] = []
+
+        for table, row in records:
+            if table == 'projects':
+                values = (row['name'], row['description'])
+            elif table == 'tasks':
+                project_id = id_maps['projects'].get(optional_int(row['project_id']))
+                if project_id is None:
+                    counts['skipped'] += 1
+                    continue
+                values = (project_id, row['name'], row['description'], strip_html(row['description']),
+                          user_ids.get(row.get('assignee')),
+                          row.get('status') or 'New')
+            elif table == 'comments':
+                task_id = id_maps['tasks'].get(optional_int(row['task_id']))
+                if task_id is None:
+                    counts['skipped'] += 1
+                    continue
+                values = (task_id, user_ids.get(row.get('username')), row['content'], row.get('created_at'))
+            else:
+                raise ValueError(f"Unknown table in import: {table}")
+            next_ids[table] += 1
+            id_maps[table][optional_int(row.get('id'))] = next_ids[table]
+            pending[table].append((next_ids[table],) + values)
+            if len(pending[table]) >= chunk_size:
+                flush(table)
+        flush(TABLES[-1])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or import projects, tasks and comments')
+    parser.add_argument('--db', default='project_management.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export')
+    export_parser.add_argument('output', help="JSONL file ('-' for stdout) or, with --format csv, a directory")
+    export_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    export_parser.add_argument('--project', type=int, help='Only export this project id')
+    import_parser = subparsers.add_parser('import')
+    import_parser.add_argument('input', help="JSONL file ('-' for stdin) or, with --format csv, a directory")
+    import_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    args = parser.parse_args()
+
+    with closing(connect(args.db)) as conn:
+        if args.command == 'export':
+            if args.format == 'csv':
+                counts = export_csv(conn, args.output, args.project)
+            elif args.output == '-':
+                counts = export_jsonl(conn, sys.stdout, args.project)
+            else:
+                with open(args.output, 'w', encoding='utf-8') as out:
+                    counts = export_jsonl(conn, out, args.project)
+        else:
+            if args.format == 'csv':
+                counts = import_rows(conn, read_csv(args.input))
+            elif args.input == '-':
+                counts = import_rows(conn, read_jsonl(sys.stdin))
+            else:
+                with open(args.input, encoding='utf-8') as f:
+                    counts = import_rows(conn, read_jsonl(f))
+    print(f"{args.command.capitalize()}ed: " + ', '.join(f'{count} {name}' for name, count in counts.items()),
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# Data and service layer of the project management tool: connection, schema, users, projects,
+# tasks, comments and notifications, plus what they are built on (the connection pool in db,
+# read_cache, change_events, query_profiler, text_search, credentials, notification_settings) and
+# the background jobs (email_outbox with smtp_pool, maintenance). Importing it has no side effects
+# and needs no Streamlit; call bootstrap.bootstrap() once per process before use.
@@ -0,0 +1,52 @@
+import threading
+import time
+from contextlib import contextmanager
+from project_management.notifications import load_notification_config
+from project_management.schema import init_db
+from project_management.users import create_default_admin
+
+# What startup did and how long each step took, in the order the steps ran
+class StartupReport:
+    def __init__(self):
+        self.timings = {}  # step -> seconds
+        self.admin_created = False
+        self.admin_announced = False
+        self.outbox_worker = None  # Set by app.py when it starts the email outbox worker
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def summary(self):
+        steps = ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in self.timings.items())
+        return f'{self.total() * 1000:.0f} ms ({steps})'
+
+# Whether app.py starts its background workers (email outbox, maintenance). Set to False before
+# importing app to run it on its own, e.g. in benchmark.py or when the workers run as separate processes.
+START_WORKERS = True
+
+startup_lock = threading.Lock()
+startup_report = None
+
+# Schema setup, notification settings and the initial admin, run once per process however many
+# sessions or entry points call it. Later calls return the first call's report.
+def bootstrap():
+    global startup_report
+    with startup_lock:
+        if startup_report is None:
+            report = StartupReport()
+            with report.step('schema'):
+                init_db()
+            with report.step('notification settings'):
+                load_notification_config()
+            with report.step('initial admin'):
+                report.admin_created = create_default_admin()
+            startup_report = report
+        return startup_report
@@ -0,0 +1,29 @@
+import threading
+
+# In-process change notifications for sessions that show live data.
+# Writers publish the topics they changed, e.g. ('project', project_id) or ('user', user_id); each
+# publish bumps the topics' versions, and a reader reloads only when a version moved past the one
+# it last rendered. Checking a version is a dict lookup, so readers can poll it on a timer for free.
+# Changes committed by other processes (e.g. api_server.py) are not seen here.
+class ChangeBus:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.versions = {}  # topic -> sequence number of its last change
+
+    def publish(self, *topics):
+        if not topics:
+            return
+        with self.lock:
+            self.sequence += 1
+            for topic in topics:
+                self.versions[topic] = self.sequence
+
+    # Latest change to any of the topics, 0 if they never changed
+    def version(self, *topics):
+        with self.lock:
+            return max((self.versions.get(topic, 0) for topic in topics), default=0)
+
+    def stats(self):
+        with self.lock:
+            return {'published': self.sequence, 'topics': len(self.versions)}
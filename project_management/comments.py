@@ -0,0 +1,28 @@
+from datetime import datetime
+from project_management.connection import get_cursor, publish_change, transaction
+from project_management.notifications import notify_admin
+
+# Returns False if the task no longer exists, e.g. another session deleted it
+def add_comment(task_id, user_id, content):
+    with transaction() as c:
+        c.execute('''INSERT INTO comments (task_id, user_id, content, created_at)
+                     SELECT id, ?, ?, ? FROM tasks WHERE id=?
+                     RETURNING (SELECT name FROM tasks WHERE id=?), (SELECT project_id FROM tasks WHERE id=?),
+                               (SELECT username FROM users WHERE id=?)''',
+                  (user_id, content, datetime.now(), task_id, task_id, task_id, user_id))
+        rows = c.fetchall()
+        if not rows:
+            return False
+        task_name, project_id, username = rows[0]
+        notify_admin(f"New comment on task '{task_name}' by {username}", task_id)
+        publish_change(('project', project_id))
+    return True
+
+def get_comments(task_id):
+    c = get_cursor()
+    c.execute('''SELECT comments.content, comments.created_at, users.username 
+                 FROM comments 
+                 JOIN users ON comments.user_id = users.id 
+                 WHERE comments.task_id=? 
+                 ORDER BY comments.created_at DESC''', (task_id,))
+    return c.fetchall()
@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+from project_management.change_events import ChangeBus
+from project_management.db import ConnectionManager
+from project_management.query_profiler import ProfilingConnection, stop_profiling
+from project_management.read_cache import ReadCache
+
+# Database connection; set DB_PATH before the first query to use another database
+DB_PATH = 'project_management.db'
+DB_JOURNAL_MODE = 'WAL'  # Readers no longer block behind a writer
+DB_BUSY_TIMEOUT_MS = 5000  # Wait this long for a competing writer before "database is locked"
+DB_SYNCHRONOUS = 'NORMAL'  # Safe with WAL; 'FULL' trades write throughput for durability on power loss
+DB_POOL_SIZE = 16  # Connections shared by the process's threads (sessions, API requests); more threads wait
+DB_POOL_TIMEOUT_SECONDS = 30  # How long a thread waits for a free connection
+
+# One connection pool per process (WAL mode), opened on first use; each thread checks out a connection
+# on its first query and returns it when it finishes or calls release_connection()
+connections = None
+connections_lock = threading.Lock()
+
+def get_connections():
+    global connections
+    with connections_lock:
+        if connections is None:
+            connections = ConnectionManager(DB_PATH, journal_mode=DB_JOURNAL_MODE, busy_timeout=DB_BUSY_TIMEOUT_MS,
+                                            synchronous=DB_SYNCHRONOUS, max_size=DB_POOL_SIZE,
+                                            pool_timeout=DB_POOL_TIMEOUT_SECONDS, factory=ProfilingConnection,
+                                            reset=stop_profiling)
+        return connections
+
+# Shared cache for small, rarely changing readers; writers invalidate after committing
+READ_CACHE_TTL_SECONDS = 60
+
+read_cache = ReadCache(ttl=READ_CACHE_TTL_SECONDS)
+
+# Change notifications for live views (see ChangeBus); writers call publish_change()
+change_bus = ChangeBus()
+
+# Function to get the current thread's connection
+def get_connection():
+    return (connections or get_connections()).get()
+
+# Give the current thread's connection back to the pool, e.g. at the end of a request
+def release_connection():
+    if connections is not None:
+        connections.release()
+
+# Function to get a new cursor
+def get_cursor():
+    return get_connection().cursor()
+
+# Group the statements of one user action into a single transaction with one commit.
+# Nested transaction() blocks join the outermost one, which commits or rolls back.
+# BEGIN IMMEDIATE takes the write lock up front, waiting out other writers with the busy
+# timeout; a deferred BEGIN can fail with "database is locked" when its read snapshot is
+# overtaken by another writer's commit before it starts writing.
+transaction_state = threading.local()
+
+@contextmanager
+def transaction():
+    depth = getattr(transaction_state, 'depth', 0)
+    conn = get_connection()
+    c = conn.cursor()
+    if depth == 0:
+        transaction_state.changes = []
+        if not conn.in_transaction:
+            c.execute('BEGIN IMMEDIATE')
+    transaction_state.depth = depth + 1
+    try:
+        yield c
+    except BaseException:
+        transaction_state.depth = depth
+        if depth == 0:
+            transaction_state.changes = []
+            conn.rollback()
+        raise
+    transaction_state.depth = depth
+    if depth == 0:
+        conn.commit()
+        changes, transaction_state.changes = transaction_state.changes, []
+        change_bus.publish(*changes)
+
+# Publish changed topics once the enclosing transaction() commits (nothing on rollback), so a
+# reader woken by the change sees the committed rows; outside a transaction, publish now
+def publish_change(*topics):
+    if getattr(transaction_state, 'depth', 0):
+        transaction_state.changes.extend(topics)
+    else:
+        change_bus.publish(*topics)
@@ -0,0 +1,189 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# Password hashing settings. Raising a work factor makes logins slower and rehashes
+# every stored password to the new setting the next time its user logs in.
+PASSWORD_SCHEME = 'scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2_sha256'  # scrypt needs OpenSSL 1.1+
+SCRYPT_N = 2 ** 14  # CPU/memory cost; about 16 MB and tens of milliseconds per hash
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+
+# Login settings
+LOGIN_VERIFY_WORKERS = 2  # Password checks running at once; bounds the CPU a login storm can take
+LOGIN_MAX_PENDING = 32  # Password checks waiting for a worker before new logins are turned away
+LOGIN_VERIFY_TIMEOUT = 10  # Seconds a login waits for its password check
+LOGIN_FAILURE_WINDOW = 300  # Seconds failed attempts are remembered
+LOGIN_MAX_FAILURES_PER_USER = 5
+LOGIN_MAX_FAILURES_PER_CLIENT = 20
+LOGIN_MAX_TRACKED_KEYS = 10000  # Usernames and client addresses remembered at once; the stalest are forgotten first
+
+def b64encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+def b64decode(text):
+    return base64.b64decode(text.encode('ascii'))
+
+def work_factor(scheme):
+    if scheme == 'scrypt':
+        return [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    if scheme == 'pbkdf2_sha256':
+        return [str(PBKDF2_ITERATIONS)]
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+# Stored form: scheme$work factor...$salt$hash, e.g. scrypt$16384$8$1$<salt>$<hash>
+def hash_password(password, scheme=PASSWORD_SCHEME):
+    salt = os.urandom(SALT_BYTES)
+    if scheme == 'scrypt':
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    else:
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
+    return '$'.join([scheme] + work_factor(scheme) + [b64encode(salt), b64encode(digest)])
+
+# Unsalted SHA-256 hex digests written before the KDF was introduced
+def is_legacy_hash(stored):
+    return len(stored) == 64 and '$' not in stored
+
+def verify_password(password, stored):
+    if not stored:
+        return False
+    if is_legacy_hash(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    scheme, *fields = stored.split('$')
+    if scheme == 'scrypt':
+        n, r, p, salt, expected = fields
+        digest = hashlib.scrypt(password.encode(), salt=b64decode(salt), n=int(n), r=int(r), p=int(p))
+    elif scheme == 'pbkdf2_sha256':
+        iterations, salt, expected = fields
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), b64decode(salt), int(iterations))
+    else:
+        return False
+    return hmac.compare_digest(digest, b64decode(expected))
+
+# True when a stored hash is legacy or was made with settings other than the current ones
+def needs_rehash(stored, scheme=PASSWORD_SCHEME):
+    if is_legacy_hash(stored):
+        return True
+    fields = stored.split('$')
+    return fields[0] != scheme or fields[1:-2] != work_factor(scheme)
+
+# The hashing pool is saturated or a hash took longer than the timeout. Logins report it as
+# LoginThrottled; other callers (e.g. creating a user) get this and can ask to try again.
+class CredentialsBusy(Exception):
+    def __init__(self, retry_after=1):
+        super().__init__("Too many password checks running; try again in a moment")
+        self.retry_after = retry_after
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts; try again in {int(retry_after) + 1} seconds")
+        self.retry_after = retry_after
+
+# Failed logins per username and per client address within a sliding window.
+# A throttled attempt is refused before its password is hashed, so it costs no CPU.
+# Keys are kept in order of their latest failure, so failed() drops expired ones from the front and
+# memory stays bounded by max_keys however many usernames or addresses an attacker sprays.
+class LoginThrottle:
+    def __init__(self, window=LOGIN_FAILURE_WINDOW, max_per_user=LOGIN_MAX_FAILURES_PER_USER,
+                 max_per_client=LOGIN_MAX_FAILURES_PER_CLIENT, max_keys=LOGIN_MAX_TRACKED_KEYS):
+        self.window = window
+        self.limits = {'user': max_per_user, 'client': max_per_client}
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.failures = OrderedDict()  # (kind, key) -> deque of failure times, least recently failed first
+
+    def keys(self, username, client):
+        keys = [('user', (username or '').lower())]
+        if client:
+            keys.append(('client', client))
+        return keys
+
+    # Seconds until another attempt is allowed; 0 if it is allowed now
+    def retry_after(self, username, client=None):
+        now = time.monotonic()
+        wait = 0
+        with self.lock:
+            for key in self.keys(username, client):
+                times = self.failures.get(key)
+                if not times:
+                    continue
+                while times and times[0] <= now - self.window:
+                    times.popleft()
+                if not times:
+                    del self.failures[key]
+                elif len(times) >= self.limits[key[0]]:
+                    wait = max(wait, times[0] + self.window - now)
+        return wait
+
+    def check(self, username, client=None):
+        wait = self.retry_after(username, client)
+        if wait:
+            raise LoginThrottled(wait)
+
+    def failed(self, username, client=None):
+        now = time.monotonic()
+        with self.lock:
+            for key in self.keys(username, client):
+                times = self.failures.setdefault(key, deque())
+                while times and times[0] <= now - self.window:
+                    times.popleft()
+                times.append(now)
+                self.failures.move_to_end(key)
+            while self.failures:
+                key, times = next(iter(self.failures.items()))
+                if times and times[-1] > now - self.window and len(self.failures) <= self.max_keys:
+                    break
+                del self.failures[key]
+
+    # A successful login clears the user's failures, not the client's
+    def succeeded(self, username, client=None):
+        with self.lock:
+            self.failures.pop(('user', (username or '').lower()), None)
+
+# Runs password checks and hashing on a small thread pool (hashlib releases the GIL while hashing),
+# so concurrent logins share a fixed amount of CPU. Work beyond max_pending is turned away.
+class CredentialVerifier:
+    def __init__(self, max_workers=LOGIN_VERIFY_WORKERS, max_pending=LOGIN_MAX_PENDING, timeout=LOGIN_VERIFY_TIMEOUT):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='credentials')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+        self.dummy_hash = None
+
+    def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise CredentialsBusy()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        # The slot is held until the work finishes, even if the caller stops waiting for it
+        future.add_done_callback(lambda future: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise CredentialsBusy() from None
+
+    # Unknown usernames are checked against a dummy hash, so they take as long as real ones.
+    # Raises LoginThrottled when busy.
+    def verify(self, password, stored):
+        try:
+            if stored is None and self.dummy_hash is None:
+                self.dummy_hash = self.run(hash_password, '')
+            return self.run(verify_password, password, stored or self.dummy_hash) and stored is not None
+        except CredentialsBusy as e:
+            raise LoginThrottled(e.retry_after) from None
+
+    # Raises CredentialsBusy when busy
+    def hash(self, password):
+        return self.run(hash_password, password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,131 @@
+import queue
+import sqlite3
+import threading
+import weakref
+
+# Bounded pool of connections to one database file. A thread checks a connection out on its first
+# get() and keeps it until release(), or until the thread finishes; it then goes back to the pool
+# for the next thread instead of being closed. At most max_size connections are open: when all are
+# checked out, get() waits up to pool_timeout seconds for one and then raises OperationalError.
+# setup, if given, is called with each new connection (e.g. to register SQL functions).
+# reset, if given, is called with each connection checked back in (e.g. to clear per-run state).
+# factory is the sqlite3.Connection subclass to use (e.g. one that records statements).
+# The SQLite and pool settings are passed in; connection.py holds the ones the app uses.
+class ConnectionManager:
+    def __init__(self, path, *, journal_mode, busy_timeout, synchronous, max_size, pool_timeout,
+                 setup=None, factory=sqlite3.Connection, reset=None):
+        self.path = path
+        self.factory = factory
+        self.journal_mode = journal_mode
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.setup = setup
+        self.reset = reset
+        self.max_size = max_size
+        self.pool_timeout = pool_timeout
+        self.lock = threading.Lock()
+        self.idle = queue.LifoQueue()  # Most recently used first, so its page cache is warm
+        self.opened = 0
+        self.generation = 0  # Bumped by close_all(); older connections are closed on check-in
+        self.local = threading.local()
+        conn = self.connect()
+        conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, check_same_thread=False,
+                               factory=self.factory)
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        if self.setup is not None:
+            self.setup(conn)
+        return conn
+
+    # Returns (connection, generation): an idle one, a new one while under max_size, or one
+    # checked in by another thread within pool_timeout
+    def check_out(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.max_size:
+                self.opened += 1
+                generation = self.generation
+            else:
+                generation = None
+        if generation is not None:
+            try:
+                return self.connect(), generation
+            except BaseException:
+                with self.lock:
+                    self.opened -= 1
+                raise
+        try:
+            return self.idle.get(timeout=self.pool_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f'no database connection free after {self.pool_timeout}s ({self.max_size} in use)') from None
+
+    def check_in(self, conn, generation):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self.reset is not None:
+                self.reset(conn)
+        except sqlite3.Error:
+            generation = None
+        with self.lock:
+            keep = generation == self.generation
+            if not keep:
+                self.opened -= 1
+        if keep:
+            self.idle.put((conn, generation))
+        else:
+            conn.close()
+
+    # The current thread's connection, checked out on first use
+    def get(self):
+        lease = getattr(self.local, 'lease', None)
+        if lease is None:
+            conn, generation = self.check_out()
+            lease = ConnectionLease(conn)
+            # Runs on release(), or when the thread finishes and its thread-local lease is dropped
+            lease.finalizer = weakref.finalize(lease, self.check_in, conn, generation)
+            self.local.lease = lease
+        return lease.conn
+
+    # Give the current thread's connection back to the pool; the next get() checks one out again.
+    # Long-lived threads call this between units of work (e.g. after each request).
+    def release(self):
+        lease = getattr(self.local, 'lease', None)
+        if lease is not None:
+            del self.local.lease
+            lease.finalizer()
+
+    def open_connections(self):
+        with self.lock:
+            return self.opened
+
+    def stats(self):
+        with self.lock:
+            return {'open': self.opened, 'idle': self.idle.qsize(), 'max_size': self.max_size}
+
+    # Close the idle connections now and the checked-out ones when they are checked in
+    def close_all(self):
+        with self.lock:
+            self.generation += 1
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            with self.lock:
+                self.opened -= 1
+            conn.close()
+
+class ConnectionLease:
+    def __init__(self, conn):
+        self.conn = conn
+        self.finalizer = None
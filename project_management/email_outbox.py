@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import traceback
+from contextlib import closing
+from datetime import datetime, timedelta
+from project_management.smtp_pool import SMTPPool
+
+# Email configuration
+EMAIL_HOST = 'smtp.gmail.com'  # Replace with your SMTP server
+EMAIL_PORT = 587  # Replace with your SMTP port
+EMAIL_HOST_USER = 'your_email@gmail.com'  # Replace with your email
+EMAIL_HOST_PASSWORD = 'your_email_password'  # Replace with your email password
+EMAIL_FROM = EMAIL_HOST_USER  # Sender address; may differ from the login, or be set when the server needs no login
+EMAIL_USE_TLS = True  # Set to False for a local test server without STARTTLS
+EMAIL_TIMEOUT = 30  # Seconds before an SMTP connection attempt gives up
+EMAIL_IDLE_TIMEOUT = 60  # Seconds an idle SMTP session is kept open for reuse
+
+# Outbox delivery settings
+OUTBOX_POLL_SECONDS = 5
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 30  # Doubled after every failed attempt
+OUTBOX_LEASE_SECONDS = 600  # A claimed batch is retried after this long if its worker never reports back
+
+def create_smtp_pool(host=EMAIL_HOST, port=EMAIL_PORT, user=EMAIL_HOST_USER, password=EMAIL_HOST_PASSWORD,
+                     use_tls=EMAIL_USE_TLS, **options):
+    options.setdefault('from_email', EMAIL_FROM)
+    options.setdefault('timeout', EMAIL_TIMEOUT)
+    options.setdefault('idle_timeout', EMAIL_IDLE_TIMEOUT)
+    return SMTPPool(host, port, user, password, use_tls, **options)
+
+# Add an email to the outbox; the caller commits
+def queue_email(cursor, to_email, subject, body):
+    now = datetime.now()
+    cursor.execute('''INSERT INTO email_outbox (to_email, subject, body, attempts, next_attempt_at, created_at)
+                      VALUES (?, ?, ?, 0, ?, ?)''', (to_email, subject, body, now, now))
+
+# Background thread that drains the outbox, retrying failed sends with exponential backoff.
+# Several workers (e.g. the app's and `python -m project_management.email_outbox`) can run against one database:
+# each claims its batch before sending, so a message goes out once.
+class OutboxWorker(threading.Thread):
+    def __init__(self, db_path, poll_seconds=OUTBOX_POLL_SECONDS, batch_size=OUTBOX_BATCH_SIZE,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS, backoff_seconds=OUTBOX_BACKOFF_SECONDS,
+                 lease_seconds=OUTBOX_LEASE_SECONDS, **smtp_settings):
+        super().__init__(name='email-outbox', daemon=True)
+        self.db_path = db_path
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.pool = create_smtp_pool(**smtp_settings)
+        self.stop_event = threading.Event()
+
+    # Send one batch of due messages over pooled SMTP sessions; returns the number delivered.
+    # The batch is claimed first by moving its next_attempt_at past the lease, so other workers
+    # skip it; the results below then set the real retry time.
+    def drain(self):
+        sent = 0
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            c = conn.cursor()
+            now = datetime.now()
+            c.execute('BEGIN IMMEDIATE')
+            c.execute('''UPDATE email_outbox SET next_attempt_at=?
+                         WHERE id IN (SELECT id FROM email_outbox
+                                      WHERE sent_at IS NULL AND attempts < ? AND next_attempt_at <= ?
+                                      ORDER BY id LIMIT ?)
+                         RETURNING id, to_email, subject, body, attempts''',
+                      (now + timedelta(seconds=self.lease_seconds), self.max_attempts, now, self.batch_size))
+            rows = sorted(c.fetchall())
+            conn.commit()
+            if not rows:
+                self.pool.prune()
+                return 0
+            # Results are written back even if the batch fails partway, so delivered messages are
+            # not sent again when the lease runs out and the rest count an attempt
+            errors = []
+            batch_error = None
+            try:
+                self.pool.send_batch([(to_email, subject, body) for _, to_email, subject, body, _ in rows], errors)
+            except Exception as e:
+                batch_error = e
+            errors += [batch_error] * (len(rows) - len(errors))
+            now = datetime.now()
+            for (message_id, _, _, _, attempts), error in zip(rows, errors):
+                if error is None:
+                    c.execute('UPDATE email_outbox SET attempts=?, sent_at=?, last_error=NULL WHERE id=?',
+                              (attempts + 1, now, message_id))
+                    sent += 1
+                else:
+                    retry_at = now + timedelta(seconds=self.backoff_seconds * 2 ** attempts)
+                    c.execute('UPDATE email_outbox SET attempts=?, next_attempt_at=?, last_error=? WHERE id=?',
+                              (attempts + 1, retry_at, str(error), message_id))
+            conn.commit()
+        if batch_error is not None:
+            raise batch_error
+        return sent
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                sent = self.drain()
+            except Exception:
+                # Keep the worker alive; a failed batch is retried once its lease expires
+                print("Email outbox error:")
+                traceback.print_exc()
+                sent = 0
+            # Keep going straight away while there is a backlog
+            if sent < self.batch_size:
+                self.stop_event.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stop_event.set()
+        self.pool.close()
+
+if __name__ == "__main__":
+    # Run the worker as a standalone process next to the Streamlit app: python -m project_management.email_outbox
+    worker = OutboxWorker('project_management.db')
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
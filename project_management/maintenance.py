@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import closing
+from datetime import datetime, timedelta
+
+# Retention settings
+NOTIFICATION_MAX_AGE_DAYS = 90
+NOTIFICATION_MAX_PER_USER = 1000
+COMMENT_MAX_AGE_DAYS = None  # Comments are kept forever unless set
+ARCHIVE_DIR = 'archive'  # Deleted rows are appended here as JSON lines; None to skip archiving
+
+# Maintenance job settings
+MAINTENANCE_INTERVAL_HOURS = 24
+MAINTENANCE_HOUR = 3  # Local hour of the first run (off-peak); None to start one interval after launch
+DELETE_CHUNK_SIZE = 500  # Rows deleted per transaction, so the write lock is released between chunks
+CHUNK_PAUSE_SECONDS = 0.05  # Gives waiting writers a turn between chunks
+VACUUM_FREE_RATIO = 0.25  # VACUUM once this fraction of the file is free pages
+
+# What to keep of one table: rows older than max_age_days, and rows beyond the newest
+# max_per_owner for each owner_column value, are archived and deleted.
+class RetentionPolicy:
+    def __init__(self, table, max_age_days=None, max_per_owner=None, owner_column='user_id', archive_dir=ARCHIVE_DIR):
+        self.table = table
+        self.max_age_days = max_age_days
+        self.max_per_owner = max_per_owner
+        self.owner_column = owner_column
+        self.archive_dir = archive_dir
+
+def default_policies():
+    return [
+        RetentionPolicy('notifications', NOTIFICATION_MAX_AGE_DAYS, NOTIFICATION_MAX_PER_USER),
+        RetentionPolicy('comments', COMMENT_MAX_AGE_DAYS),
+    ]
+
+def archive_rows(conn, policy, ids):
+    c = conn.cursor()
+    c.execute(f"SELECT * FROM {policy.table} WHERE id IN ({', '.join('?' * len(ids))})", ids)
+    columns = [column[0] for column in c.description]
+    os.makedirs(policy.archive_dir, exist_ok=True)
+    path = os.path.join(policy.archive_dir, f"{policy.table}-{datetime.now():%Y%m%d}.jsonl")
+    with open(path, 'a', encoding='utf-8') as archive:
+        for row in c:
+            archive.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+
+# Archive and delete the rows matched by select_sql (which must return ids, LIMIT ?) chunk by chunk
+def delete_in_chunks(conn, policy, select_sql, params, chunk_size):
+    deleted = 0
+    c = conn.cursor()
+    while True:
+        c.execute(select_sql, params + [chunk_size])
+        ids = [row[0] for row in c.fetchall()]
+        if not ids:
+            return deleted
+        if policy.archive_dir:
+            archive_rows(conn, policy, ids)
+        c.execute(f"DELETE FROM {policy.table} WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        conn.commit()
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            return deleted
+        time.sleep(CHUNK_PAUSE_SECONDS)
+
+def apply_policy(conn, policy, chunk_size=DELETE_CHUNK_SIZE):
+    deleted = 0
+    if policy.max_age_days is not None:
+        cutoff = datetime.now() - timedelta(days=policy.max_age_days)
+        deleted += delete_in_chunks(conn, policy, f'SELECT id FROM {policy.table} WHERE created_at<? ORDER BY id LIMIT ?',
+                                    [cutoff], chunk_size)
+    if policy.max_per_owner is not None:
+        c = conn.cursor()
+        c.execute(f'SELECT {policy.owner_column} FROM {policy.table} GROUP BY {policy.owner_column} HAVING COUNT(*)>?',
+                  (policy.max_per_owner,))
+        for (owner,) in c.fetchall():
+            # Everything past the newest max_per_owner rows; OFFSET stays put as older chunks are deleted
+            deleted += delete_in_chunks(conn, policy,
+                                        f'''SELECT id FROM {policy.table} WHERE {policy.owner_column}=?
+                                            ORDER BY id DESC LIMIT ? OFFSET {int(policy.max_per_owner)}''',
+                                        [owner], chunk_size)
+    return deleted
+
+def compact(conn, vacuum_free_ratio=VACUUM_FREE_RATIO):
+    c = conn.cursor()
+    c.execute('PRAGMA optimize')
+    page_count = c.execute('PRAGMA page_count').fetchone()[0]
+    free_pages = c.execute('PRAGMA freelist_count').fetchone()[0]
+    if page_count and free_pages / page_count >= vacuum_free_ratio:
+        c.execute('VACUUM')
+        return True
+    return False
+
+# Apply every retention policy, then compact; returns {table: rows deleted, 'vacuumed': bool}
+def run_maintenance(db_path, policies=None, chunk_size=DELETE_CHUNK_SIZE, vacuum_free_ratio=VACUUM_FREE_RATIO):
+    summary = {}
+    with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+        for policy in policies if policies is not None else default_policies():
+            summary[policy.table] = summary.get(policy.table, 0) + apply_policy(conn, policy, chunk_size)
+        summary['vacuumed'] = compact(conn, vacuum_free_ratio)
+    return summary
+
+# Seconds from now until the next time the clock shows hour:00
+def seconds_until_hour(hour, now=None):
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+# Background thread that runs the maintenance job on a fixed interval. The first run waits for
+# start_hour (or one interval), so an app restart at a busy time does not start deleting and vacuuming.
+class MaintenanceWorker(threading.Thread):
+    def __init__(self, db_path, interval_hours=MAINTENANCE_INTERVAL_HOURS, policies=None, start_hour=MAINTENANCE_HOUR):
+        super().__init__(name='maintenance', daemon=True)
+        self.db_path = db_path
+        self.interval_hours = interval_hours
+        self.policies = policies
+        self.start_hour = start_hour
+        self.stop_event = threading.Event()
+        self.last_run = None
+        self.last_summary = None
+
+    def run(self):
+        if self.start_hour is None:
+            delay = self.interval_hours * 3600
+        else:
+            delay = seconds_until_hour(self.start_hour)
+        while not self.stop_event.wait(delay):
+            try:
+                self.last_summary = run_maintenance(self.db_path, self.policies)
+                self.last_run = datetime.now()
+            except Exception:
+                # Keep the schedule; the next run starts over from whatever this one finished
+                print("Maintenance error:")
+                traceback.print_exc()
+            delay = self.interval_hours * 3600
+
+    def stop(self):
+        self.stop_event.set()
+
+if __name__ == "__main__":
+    # Run the maintenance job once, e.g. from cron: python -m project_management.maintenance
+    print(run_maintenance('project_management.db'))
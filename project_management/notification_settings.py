@@ -0,0 +1,69 @@
+import threading
+import time
+
+DEFAULT_SETTINGS = {'email': True, 'in_app': True, 'sms': False}
+DEFAULT_USER_PREFERENCES = {'email': True, 'in_app': True, 'sms': True}
+CHECK_INTERVAL_SECONDS = 5  # How often to look for changes made outside this process
+
+def row_to_settings(email, in_app, sms):
+    return {'email': bool(email), 'in_app': bool(in_app), 'sms': bool(sms)}
+
+# In-process copy of the global notification settings and every user's preferences.
+# Loaded at startup; writers update it after committing, so reads don't query. Changes made by
+# another process (e.g. the app while this is api_server.py) bump the settings version, which is
+# checked at most every check_interval seconds before a read, and the copy is then reloaded.
+class NotificationConfig:
+    def __init__(self, check_interval=CHECK_INTERVAL_SECONDS):
+        self.lock = threading.Lock()
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.user_preferences = {}
+        self.check_interval = check_interval
+        self.connect = None  # Returns the connection to load and check versions with
+        self.version = None
+        self.checked_at = 0.0
+
+    def load(self, connect):
+        self.connect = connect
+        c = connect().cursor()
+        c.execute('SELECT email, in_app, sms, version FROM notification_settings ORDER BY id LIMIT 1')
+        row = c.fetchone()
+        c.execute('SELECT user_id, email, in_app, sms FROM user_notification_settings')
+        user_preferences = {user_id: row_to_settings(email, in_app, sms) for user_id, email, in_app, sms in c.fetchall()}
+        with self.lock:
+            self.settings = row_to_settings(*row[:3]) if row else dict(DEFAULT_SETTINGS)
+            self.user_preferences = user_preferences
+            self.version = row[3] if row else None
+            self.checked_at = time.monotonic()
+
+    def refresh(self):
+        if self.connect is None or time.monotonic() - self.checked_at < self.check_interval:
+            return
+        self.checked_at = time.monotonic()
+        row = self.connect().execute('SELECT version FROM notification_settings ORDER BY id LIMIT 1').fetchone()
+        if (row[0] if row else None) != self.version:
+            self.load(self.connect)
+
+    def get(self):
+        self.refresh()
+        with self.lock:
+            return dict(self.settings)
+
+    def set(self, email, in_app, sms):
+        with self.lock:
+            self.settings = row_to_settings(email, in_app, sms)
+
+    def get_user(self, user_id):
+        self.refresh()
+        with self.lock:
+            return dict(self.user_preferences.get(user_id, DEFAULT_USER_PREFERENCES))
+
+    def set_user(self, user_id, email, in_app, sms):
+        with self.lock:
+            self.user_preferences[user_id] = row_to_settings(email, in_app, sms)
+
+    # A channel is used for a user only when it is enabled globally and the user has not opted out
+    def for_user(self, user_id):
+        self.refresh()
+        with self.lock:
+            preferences = self.user_preferences.get(user_id, DEFAULT_USER_PREFERENCES)
+            return {channel: enabled and preferences[channel] for channel, enabled in self.settings.items()}
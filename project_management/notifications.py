@@ -0,0 +1,94 @@
+from datetime import datetime
+from project_management.connection import get_connection, get_cursor, publish_change, transaction
+from project_management.email_outbox import queue_email
+from project_management.notification_settings import NotificationConfig
+from project_management.users import get_admin_ids
+
+# Number of notifications kept in the sidebar feed
+NOTIFICATION_FEED_LIMIT = 50
+
+# Global notification settings and per-user preferences, held in memory.
+# load_notification_config() reads them once the schema exists; the writers below keep them current,
+# and changes made by other processes are picked up within CHECK_INTERVAL_SECONDS.
+notification_config = NotificationConfig()
+
+def load_notification_config():
+    notification_config.load(get_connection)
+
+# Emails are queued in the outbox and sent by the background worker
+def send_email_notification(to_email, subject, body):
+    with transaction() as c:
+        queue_email(c, to_email, subject, body)
+
+def send_in_app_notification(user_id, message, task_id=None):
+    with transaction() as c:
+        c.execute('INSERT INTO notifications (user_id, message, created_at, task_id) VALUES (?, ?, ?, ?)',
+                  (user_id, message, datetime.now(), task_id))
+        publish_change(('user', user_id))
+
+def send_sms_notification(phone_number, message):
+    # This is a placeholder for SMS sending logic
+    print(f"SMS notification sent to {phone_number}: {message}")
+
+def get_notifications(user_id, limit=None):
+    c = get_cursor()
+    query = 'SELECT message, created_at FROM notifications WHERE user_id=? ORDER BY id DESC'
+    if limit is not None:
+        c.execute(query + ' LIMIT ?', (user_id, limit))
+    else:
+        c.execute(query, (user_id,))
+    return c.fetchall()
+
+# Newest notifications first: (id, message, created_at, is_read). Pass the highest id
+# already shown as after_id to fetch only what arrived since, or the lowest as before_id
+# to page back through older ones.
+def get_notification_feed(user_id, after_id=None, limit=NOTIFICATION_FEED_LIMIT, before_id=None):
+    c = get_cursor()
+    query = 'SELECT id, message, created_at, is_read FROM notifications WHERE user_id=? AND id>?'
+    params = [user_id, after_id or 0]
+    if before_id is not None:
+        query += ' AND id<?'
+        params.append(before_id)
+    c.execute(query + ' ORDER BY id DESC LIMIT ?', params + [limit])
+    return c.fetchall()
+
+def get_unread_count(user_id):
+    c = get_cursor()
+    c.execute('SELECT COUNT(*) FROM notifications WHERE user_id=? AND is_read=0', (user_id,))
+    return c.fetchone()[0]
+
+# Mark notifications read, up to the high-water mark the user has actually seen
+def mark_notifications_read(user_id, up_to_id):
+    with transaction() as c:
+        c.execute('UPDATE notifications SET is_read=1 WHERE user_id=? AND is_read=0 AND id<=?', (user_id, up_to_id))
+        publish_change(('user', user_id))
+
+# Fan a notification out to every admin in one transaction
+def notify_admin(message, task_id=None):
+    admin_ids = [admin_id for admin_id in get_admin_ids() if notification_config.for_user(admin_id)['in_app']]
+    if not admin_ids:
+        return
+    created_at = datetime.now()
+    with transaction() as c:
+        c.executemany('INSERT INTO notifications (user_id, message, created_at, task_id) VALUES (?, ?, ?, ?)',
+                      [(admin_id, message, created_at, task_id) for admin_id in admin_ids])
+        publish_change(*[('user', admin_id) for admin_id in admin_ids])
+
+# Settings are served from the in-process config; the row is seeded by init_db
+def get_notification_settings():
+    return notification_config.get()
+
+def update_notification_settings(email, in_app, sms):
+    with transaction() as c:
+        c.execute('UPDATE notification_settings SET email=?, in_app=?, sms=?', (int(email), int(in_app), int(sms)))
+    notification_config.set(email, in_app, sms)
+
+def get_user_notification_preferences(user_id):
+    return notification_config.get_user(user_id)
+
+def update_user_notification_preferences(user_id, email, in_app, sms):
+    with transaction() as c:
+        c.execute('''INSERT INTO user_notification_settings (user_id, email, in_app, sms) VALUES (?, ?, ?, ?)
+                     ON CONFLICT(user_id) DO UPDATE SET email=excluded.email, in_app=excluded.in_app, sms=excluded.sms''',
+                  (user_id, int(email), int(in_app), int(sms)))
+    notification_config.set_user(user_id, email, in_app, sms)
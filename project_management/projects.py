@@ -0,0 +1,50 @@
+from project_management.connection import get_connection, get_cursor, publish_change, read_cache, transaction
+from project_management.notifications import notify_admin
+from project_management.users import get_username
+
+@read_cache.cached
+def get_projects():
+    c = get_cursor()
+    c.execute('SELECT * FROM projects')
+    return c.fetchall()
+
+# Uncached, for callers in processes the app's invalidations do not reach (e.g. the API server)
+def project_exists(project_id):
+    c = get_cursor()
+    c.execute('SELECT 1 FROM projects WHERE id=?', (project_id,))
+    return c.fetchone() is not None
+
+def create_project(name, description):
+    c = get_cursor()
+    c.execute('INSERT INTO projects (name, description) VALUES (?, ?)', (name, description))
+    get_connection().commit()
+    get_projects.invalidate()
+
+# Removes the project's whole task, comment and notification tree through ON DELETE CASCADE
+def delete_project(project_id, user_id):
+    with transaction() as c:
+        c.execute('DELETE FROM projects WHERE id=? RETURNING name', (project_id,))
+        rows = c.fetchall()
+        if rows:
+            notify_admin(f"Project '{rows[0][0]}' deleted by {get_username(c, user_id)}")
+            publish_change(('project', project_id))
+    get_projects.invalidate()
+    return bool(rows)
+
+def calculate_project_progress(project_id):
+    c = get_cursor()
+    c.execute('SELECT total_tasks, completed_tasks FROM project_stats WHERE project_id=?', (project_id,))
+    stats = c.fetchone()
+    total_tasks, completed_tasks = stats if stats else (0, 0)
+    return completed_tasks / total_tasks if total_tasks > 0 else 0
+
+# Progress of every project in one query: (id, name, total_tasks, completed_tasks, progress)
+def get_project_overview():
+    c = get_cursor()
+    c.execute('''SELECT projects.id, projects.name,
+                        COALESCE(project_stats.total_tasks, 0), COALESCE(project_stats.completed_tasks, 0)
+                 FROM projects
+                 LEFT JOIN project_stats ON projects.id = project_stats.project_id
+                 ORDER BY projects.name''')
+    return [(project_id, name, total, completed, completed / total if total > 0 else 0)
+            for project_id, name, total, completed in c.fetchall()]
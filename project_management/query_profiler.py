@@ -0,0 +1,158 @@
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+QUERY_PROFILE_MAX_STATEMENTS = 2000  # Statements logged per run; totals keep counting past this
+
+# What one rerun did on its connection: a log of statements plus totals per calling
+# function and per SQL text. The same SQL run many times by one function is the N+1 signature.
+class RunProfile:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now()
+        self.statements = []
+        self.dropped = 0
+        self.commits = 0
+        self.by_function = {}  # function -> {'statements', 'rows', 'ms'}
+        self.by_sql = {}  # (function, sql) -> {'function', 'sql', 'count', 'rows', 'ms'}
+
+    def record(self, sql, function, rows, seconds):
+        entry = {'sql': sql, 'function': function, 'rows': rows, 'ms': seconds * 1000}
+        if len(self.statements) < QUERY_PROFILE_MAX_STATEMENTS:
+            self.statements.append(entry)
+        else:
+            self.dropped += 1
+        totals = self.by_function.setdefault(function, {'statements': 0, 'rows': 0, 'ms': 0.0})
+        totals['statements'] += 1
+        totals['rows'] += rows
+        totals['ms'] += entry['ms']
+        same = self.by_sql.setdefault((function, sql), {'function': function, 'sql': sql, 'count': 0, 'rows': 0, 'ms': 0.0})
+        same['count'] += 1
+        same['rows'] += rows
+        same['ms'] += entry['ms']
+        return entry
+
+    # Rows fetched and time spent fetching after execute() belong to the statement that produced them
+    def add_fetch(self, entry, function, sql, rows, seconds):
+        ms = seconds * 1000
+        entry['rows'] += rows
+        entry['ms'] += ms
+        totals = self.by_function[function]
+        totals['rows'] += rows
+        totals['ms'] += ms
+        same = self.by_sql[(function, sql)]
+        same['rows'] += rows
+        same['ms'] += ms
+
+    def summary(self):
+        return {
+            'statements': sum(totals['statements'] for totals in self.by_function.values()),
+            'rows': sum(totals['rows'] for totals in self.by_function.values()),
+            'ms': sum(totals['ms'] for totals in self.by_function.values()),
+            'commits': self.commits,
+        }
+
+    def repeated(self, min_count=2):
+        return sorted((same for same in self.by_sql.values() if same['count'] >= min_count),
+                      key=lambda same: same['count'], reverse=True)
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'started_at': self.started_at.isoformat(),
+            **self.summary(),
+            'by_function': self.by_function,
+            'repeated': self.repeated(),
+            'log': self.statements,
+            'dropped_from_log': self.dropped,
+        }
+
+# Name of the function that issued a statement: the first frame outside this module
+def calling_function():
+    frame = sys._getframe(2)
+    while frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    return frame.f_code.co_name
+
+# Cursor that reports to its connection's profile, if one is set, and costs one attribute check otherwise
+class ProfilingCursor(sqlite3.Cursor):
+    entry = None
+
+    def execute(self, sql, parameters=()):
+        profile = self.connection.profile
+        if profile is None:
+            self.entry = None
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.track(profile, sql, calling_function(), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        profile = self.connection.profile
+        if profile is None:
+            self.entry = None
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.track(profile, sql, calling_function(), time.perf_counter() - start)
+
+    def track(self, profile, sql, function, seconds):
+        sql = ' '.join(sql.split())
+        self.entry = (profile, sql, function, profile.record(sql, function, max(self.rowcount, 0), seconds))
+
+    def fetched(self, rows, start):
+        if self.entry is not None:
+            profile, sql, function, entry = self.entry
+            profile.add_fetch(entry, function, sql, rows, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(row is not None, start)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.fetched(len(rows), start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(len(rows), start)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self.fetched(1, start)
+        return row
+
+# Connection factory for ConnectionManager: set .profile to a RunProfile to record, None to stop
+class ProfilingConnection(sqlite3.Connection):
+    profile = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    # The built-in shortcuts would bypass ProfilingCursor.execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if self.profile is not None:
+            self.profile.commits += 1
+        return super().commit()
+
+# Reset hook for ConnectionManager: a pooled connection stops recording before the next thread gets it
+def stop_profiling(conn):
+    conn.profile = None
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Thread-safe LRU cache with a TTL, for small reader functions whose results are shared by all sessions.
+# Writers call <reader>.invalidate() after committing so the next read reloads.
+# A ttl of 0 turns caching off, for a process that other processes' invalidations cannot reach.
+class ReadCache:
+    def __init__(self, ttl=60, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (name, args) -> (expires_at, value)
+        self.generations = {}  # name -> invalidation count, so a load racing an invalidation is not stored
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, loader):
+        if self.ttl <= 0:
+            with self.lock:
+                self.misses += 1
+            return loader()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.generations.get(key[0], 0)
+        value = loader()
+        with self.lock:
+            if self.generations.get(key[0], 0) != generation:
+                return value
+            self.entries[key] = (now + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, name):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == name]:
+                del self.entries[key]
+            self.generations[name] = self.generations.get(name, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'size': len(self.entries),
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    # Decorator: cache a reader by its name and arguments
+    def cached(self, func):
+        @wraps(func)
+        def wrapper(*args):
+            return self.get_or_load((func.__name__, args), lambda: func(*args))
+        wrapper.invalidate = lambda: self.invalidate(func.__name__)
+        return wrapper
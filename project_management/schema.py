@@ -0,0 +1,325 @@
+import sqlite3
+from project_management.connection import get_connection, get_cursor, transaction
+from project_management.maintenance import ARCHIVE_DIR, DELETE_CHUNK_SIZE, RetentionPolicy, archive_rows
+from project_management.text_search import strip_html
+
+# Function to add columns if they don't exist
+def add_column_if_not_exists(table, column, type):
+    c = get_cursor()
+    c.execute(f"PRAGMA table_info({table})")
+    columns = [col[1] for col in c.fetchall()]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type}")
+        get_connection().commit()
+
+# Schema migrations, applied in order and tracked in PRAGMA user_version
+def migrate_user_contact_columns():
+    add_column_if_not_exists('users', 'email', 'TEXT')
+    add_column_if_not_exists('users', 'phone_number', 'TEXT')
+
+def migrate_task_indexes():
+    c = get_cursor()
+    c.execute('CREATE INDEX IF NOT EXISTS idx_tasks_project_assignee ON tasks (project_id, assigned_to)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_tasks_project_status ON tasks (project_id, status)')
+
+def migrate_comment_notification_indexes():
+    c = get_cursor()
+    c.execute('CREATE INDEX IF NOT EXISTS idx_comments_task_created ON comments (task_id, created_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications (user_id, created_at)')
+
+# Per-project task counts, kept current by triggers on tasks
+def migrate_project_stats():
+    c = get_cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS project_stats
+                 (project_id INTEGER PRIMARY KEY, total_tasks INTEGER NOT NULL DEFAULT 0,
+                  completed_tasks INTEGER NOT NULL DEFAULT 0)''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS project_stats_task_insert AFTER INSERT ON tasks
+                 BEGIN
+                     INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+                     UPDATE project_stats
+                     SET total_tasks = total_tasks + 1,
+                         completed_tasks = completed_tasks + (NEW.status IN ('Completed', 'Closed'))
+                     WHERE project_id = NEW.project_id;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS project_stats_task_delete AFTER DELETE ON tasks
+                 BEGIN
+                     UPDATE project_stats
+                     SET total_tasks = total_tasks - 1,
+                         completed_tasks = completed_tasks - (OLD.status IN ('Completed', 'Closed'))
+                     WHERE project_id = OLD.project_id;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS project_stats_task_update AFTER UPDATE OF project_id, status ON tasks
+                 BEGIN
+                     UPDATE project_stats
+                     SET total_tasks = total_tasks - 1,
+                         completed_tasks = completed_tasks - (OLD.status IN ('Completed', 'Closed'))
+                     WHERE project_id = OLD.project_id;
+                     INSERT OR IGNORE INTO project_stats (project_id) VALUES (NEW.project_id);
+                     UPDATE project_stats
+                     SET total_tasks = total_tasks + 1,
+                         completed_tasks = completed_tasks + (NEW.status IN ('Completed', 'Closed'))
+                     WHERE project_id = NEW.project_id;
+                 END''')
+    c.execute('DELETE FROM project_stats')
+    c.execute('''INSERT INTO project_stats (project_id, total_tasks, completed_tasks)
+                 SELECT project_id, COUNT(*), SUM(status IN ('Completed', 'Closed'))
+                 FROM tasks GROUP BY project_id''')
+
+def migrate_email_outbox():
+    c = get_cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS email_outbox
+                 (id INTEGER PRIMARY KEY, to_email TEXT, subject TEXT, body TEXT, attempts INTEGER NOT NULL DEFAULT 0,
+                  next_attempt_at TIMESTAMP, last_error TEXT, created_at TIMESTAMP, sent_at TIMESTAMP)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_email_outbox_pending ON email_outbox (next_attempt_at)
+                 WHERE sent_at IS NULL''')
+
+def migrate_notification_read_state():
+    add_column_if_not_exists('notifications', 'is_read', 'INTEGER NOT NULL DEFAULT 0')
+    c = get_cursor()
+    c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications (user_id, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications (user_id) WHERE is_read=0')
+
+# Seed the global notification settings and add per-user preferences
+def migrate_notification_preferences():
+    c = get_cursor()
+    c.execute('''INSERT INTO notification_settings (email, in_app, sms)
+                 SELECT 1, 1, 0 WHERE NOT EXISTS (SELECT 1 FROM notification_settings)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS user_notification_settings
+                 (user_id INTEGER PRIMARY KEY, email INTEGER, in_app INTEGER, sms INTEGER,
+                  FOREIGN KEY (user_id) REFERENCES users(id))''')
+
+# Full-text index over task names, descriptions and comments, kept in sync by triggers.
+# Rowids encode the source row: task id * 2 for tasks, comment id * 2 + 1 for comments.
+# Task rows are indexed by migrate_task_description_text.
+def migrate_search_index():
+    c = get_cursor()
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+                 USING fts5(title, body, kind UNINDEXED, task_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS search_index_task_delete AFTER DELETE ON tasks
+                 BEGIN
+                     DELETE FROM search_index WHERE rowid = OLD.id * 2;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS search_index_comment_insert AFTER INSERT ON comments
+                 BEGIN
+                     INSERT INTO search_index (rowid, title, body, kind, task_id)
+                     VALUES (NEW.id * 2 + 1, '', NEW.content, 'comment', NEW.task_id);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS search_index_comment_update AFTER UPDATE OF content ON comments
+                 BEGIN
+                     DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1;
+                     INSERT INTO search_index (rowid, title, body, kind, task_id)
+                     VALUES (NEW.id * 2 + 1, '', NEW.content, 'comment', NEW.task_id);
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS search_index_comment_delete AFTER DELETE ON comments
+                 BEGIN
+                     DELETE FROM search_index WHERE rowid = OLD.id * 2 + 1;
+                 END''')
+    c.execute('DELETE FROM search_index')
+    c.execute('''INSERT INTO search_index (rowid, title, body, kind, task_id)
+                 SELECT id * 2 + 1, '', content, 'comment', task_id FROM comments''')
+
+# Rebuild tasks, comments and notifications with ON DELETE CASCADE foreign keys, following SQLite's
+# table-rebuild procedure. Indexes and triggers on the rebuilt tables are saved and recreated.
+# Notifications gain a task_id so that notifications about a task go when the task does, and
+# AUTOINCREMENT ids: the feed and "mark all read" track the highest id a user has seen, so ids of
+# deleted notifications must not be handed out again.
+CASCADE_TABLES = {
+    'tasks': ('''(id INTEGER PRIMARY KEY, project_id INTEGER, name TEXT, description TEXT,
+                 assigned_to INTEGER, status TEXT,
+                 FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+                 FOREIGN KEY (assigned_to) REFERENCES users(id) ON DELETE SET NULL)''',
+              'id, project_id, name, description, assigned_to, status'),
+    'comments': ('''(id INTEGER PRIMARY KEY, task_id INTEGER, user_id INTEGER, content TEXT, created_at TIMESTAMP,
+                    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL)''',
+                 'id, task_id, user_id, content, created_at'),
+    'notifications': ('''(id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, message TEXT, created_at TIMESTAMP,
+                         is_read INTEGER NOT NULL DEFAULT 0, task_id INTEGER,
+                         FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                         FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE)''',
+                      'id, user_id, message, created_at, is_read'),
+}
+
+# Rows whose parent is already gone, in delete order (comments of orphaned tasks are orphans too)
+ORPHANED_ROWS = [
+    ('tasks', 'project_id NOT IN (SELECT id FROM projects)'),
+    ('comments', 'task_id NOT IN (SELECT id FROM tasks)'),
+    ('notifications', 'user_id NOT IN (SELECT id FROM users)'),
+]
+
+# Archive (like the maintenance job does) and delete orphaned rows; returns {table: rows removed}
+def archive_orphaned_rows(conn, c):
+    removed = {}
+    for table, orphaned in ORPHANED_ROWS:
+        c.execute(f'SELECT id FROM {table} WHERE {orphaned} ORDER BY id')
+        ids = [row[0] for row in c.fetchall()]
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            chunk = ids[start:start + DELETE_CHUNK_SIZE]
+            if ARCHIVE_DIR:
+                archive_rows(conn, RetentionPolicy(table, archive_dir=ARCHIVE_DIR), chunk)
+            c.execute(f"DELETE FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        if ids:
+            removed[table] = len(ids)
+    return removed
+
+# Rebuild each {table: (columns, copied columns)} in place; the caller turns foreign keys off
+def rebuild_tables(c, tables):
+    names = ', '.join('?' * len(tables))
+    c.execute(f'''SELECT sql FROM sqlite_master
+                  WHERE type IN ('index', 'trigger') AND tbl_name IN ({names}) AND sql IS NOT NULL''',
+              list(tables))
+    dependents = [row[0] for row in c.fetchall()]
+    for table, (columns, copied) in tables.items():
+        c.execute(f'CREATE TABLE {table}_rebuild {columns}')
+        c.execute(f'INSERT INTO {table}_rebuild ({copied}) SELECT {copied} FROM {table}')
+        c.execute(f'DROP TABLE {table}')
+        c.execute(f'ALTER TABLE {table}_rebuild RENAME TO {table}')
+    for sql in dependents:
+        c.execute(sql)
+
+def migrate_cascade_foreign_keys():
+    conn = get_connection()
+    conn.commit()
+    conn.execute('PRAGMA foreign_keys=OFF')
+    try:
+        with transaction() as c:
+            # Rows whose parents are already gone would fail foreign_key_check in the rebuilt tables
+            removed = archive_orphaned_rows(conn, c)
+            c.execute('UPDATE tasks SET assigned_to=NULL WHERE assigned_to NOT IN (SELECT id FROM users)')
+            unassigned = c.rowcount
+            c.execute('UPDATE comments SET user_id=NULL WHERE user_id NOT IN (SELECT id FROM users)')
+            unattributed = c.rowcount
+
+            rebuild_tables(c, CASCADE_TABLES)
+            c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_task ON notifications (task_id)')
+            c.execute('''CREATE TRIGGER IF NOT EXISTS project_stats_project_delete AFTER DELETE ON projects
+                         BEGIN
+                             DELETE FROM project_stats WHERE project_id = OLD.id;
+                         END''')
+            c.execute('PRAGMA foreign_key_check')
+            if c.fetchall():
+                raise sqlite3.IntegrityError('foreign key check failed while rebuilding tables')
+    finally:
+        conn.execute('PRAGMA foreign_keys=ON')
+    if removed:
+        where = f' (archived in {ARCHIVE_DIR}/)' if ARCHIVE_DIR else ''
+        print('Removed rows whose parent no longer exists' + where + ': ' +
+              ', '.join(f'{count} {table}' for table, count in removed.items()))
+    if unassigned or unattributed:
+        print(f'Cleared deleted users from {unassigned} task assignments and {unattributed} comments')
+
+# Settings version, bumped by triggers on any change to the notification settings or preferences,
+# including ones made by another process or a direct edit; NotificationConfig reloads when it moves
+def migrate_notification_settings_version():
+    add_column_if_not_exists('notification_settings', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    c = get_cursor()
+    c.execute('''CREATE TRIGGER IF NOT EXISTS notification_settings_version AFTER UPDATE OF email, in_app, sms
+                 ON notification_settings BEGIN
+                     UPDATE notification_settings SET version = version + 1;
+                 END''')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS user_notification_settings_version_{event.lower()}
+                      AFTER {event} ON user_notification_settings BEGIN
+                          UPDATE notification_settings SET version = version + 1;
+                      END''')
+
+# Plain text of each task description (HTML stripped), written by the application next to the
+# description. The search index triggers copy it as is, so they are plain SQL and work on any
+# connection, not only ones with an application function registered.
+def migrate_task_description_text():
+    add_column_if_not_exists('tasks', 'description_text', 'TEXT')
+    with transaction() as c:
+        c.execute('SELECT id, description FROM tasks')
+        c.executemany('UPDATE tasks SET description_text=? WHERE id=?',
+                      [(strip_html(description), task_id) for task_id, description in c.fetchall()])
+        c.execute('DROP TRIGGER IF EXISTS search_index_task_insert')
+        c.execute('DROP TRIGGER IF EXISTS search_index_task_update')
+        c.execute('''CREATE TRIGGER search_index_task_insert AFTER INSERT ON tasks
+                     BEGIN
+                         INSERT INTO search_index (rowid, title, body, kind, task_id)
+                         VALUES (NEW.id * 2, NEW.name, NEW.description_text, 'task', NEW.id);
+                     END''')
+        c.execute('''CREATE TRIGGER search_index_task_update AFTER UPDATE OF name, description_text ON tasks
+                     BEGIN
+                         DELETE FROM search_index WHERE rowid = OLD.id * 2;
+                         INSERT INTO search_index (rowid, title, body, kind, task_id)
+                         VALUES (NEW.id * 2, NEW.name, NEW.description_text, 'task', NEW.id);
+                     END''')
+        c.execute("DELETE FROM search_index WHERE kind = 'task'")
+        c.execute('''INSERT INTO search_index (rowid, title, body, kind, task_id)
+                     SELECT id * 2, name, description_text, 'task', id FROM tasks''')
+
+# Databases whose notifications were rebuilt before CASCADE_TABLES declared AUTOINCREMENT get it
+# now. Ids already freed by deleting the newest notifications cannot be told apart any more;
+# from here on the sequence only moves forward.
+def migrate_notification_id_autoincrement():
+    c = get_cursor()
+    c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='notifications'")
+    if 'AUTOINCREMENT' in c.fetchone()[0].upper():
+        return
+    conn = get_connection()
+    conn.commit()
+    conn.execute('PRAGMA foreign_keys=OFF')
+    try:
+        with transaction() as c:
+            columns, _ = CASCADE_TABLES['notifications']
+            rebuild_tables(c, {'notifications': (columns, 'id, user_id, message, created_at, is_read, task_id')})
+            c.execute('PRAGMA foreign_key_check')
+            if c.fetchall():
+                raise sqlite3.IntegrityError('foreign key check failed while rebuilding notifications')
+    finally:
+        conn.execute('PRAGMA foreign_keys=ON')
+
+MIGRATIONS = [
+    migrate_user_contact_columns,
+    migrate_task_indexes,
+    migrate_comment_notification_indexes,
+    migrate_project_stats,
+    migrate_email_outbox,
+    migrate_notification_read_state,
+    migrate_notification_preferences,
+    migrate_search_index,
+    migrate_cascade_foreign_keys,
+    migrate_notification_settings_version,
+    migrate_task_description_text,
+    migrate_notification_id_autoincrement,
+]
+
+def run_migrations():
+    c = get_cursor()
+    c.execute('PRAGMA user_version')
+    version = c.fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration()
+        c.execute(f'PRAGMA user_version = {number}')
+        get_connection().commit()
+
+# Create tables and run pending migrations
+def init_db():
+    c = get_cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT, is_admin INTEGER)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS projects
+                 (id INTEGER PRIMARY KEY, name TEXT, description TEXT)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS tasks
+                 (id INTEGER PRIMARY KEY, project_id INTEGER, name TEXT, description TEXT, 
+                  assigned_to INTEGER, status TEXT, 
+                  FOREIGN KEY (project_id) REFERENCES projects(id),
+                  FOREIGN KEY (assigned_to) REFERENCES users(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS comments
+                 (id INTEGER PRIMARY KEY, task_id INTEGER, user_id INTEGER, content TEXT, created_at TIMESTAMP,
+                  FOREIGN KEY (task_id) REFERENCES tasks(id),
+                  FOREIGN KEY (user_id) REFERENCES users(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS notifications
+                 (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, created_at TIMESTAMP,
+                  FOREIGN KEY (user_id) REFERENCES users(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS notification_settings
+                 (id INTEGER PRIMARY KEY, email INTEGER, in_app INTEGER, sms INTEGER)''')
+
+    get_connection().commit()
+    run_migrations()
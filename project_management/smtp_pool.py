@@ -0,0 +1,197 @@
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# Errors after which an SMTP connection can no longer be used. SMTPException subclasses OSError,
+# so other SMTP errors (e.g. a refused recipient) are told apart and leave the session usable.
+def is_connection_error(error):
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+def build_message(from_email, to_email, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = from_email
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+# Pool of logged-in SMTP sessions that are reused across messages.
+# Idle sessions are health-checked with NOOP before reuse and closed after idle_timeout seconds.
+# Messages are sent from from_email, which defaults to the login user.
+class SMTPPool:
+    def __init__(self, host, port, user=None, password=None, use_tls=True, timeout=30,
+                 max_idle=2, idle_timeout=60, max_messages_per_connection=100, from_email=None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_email = from_email or user
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.lock = threading.Lock()
+        self.idle = []  # (server, messages_sent, idle_since)
+        self.metrics = {
+            'connections_opened': 0,  # one TCP connect + STARTTLS + AUTH each
+            'connections_reused': 0,
+            'connections_closed': 0,
+            'health_check_failures': 0,
+            'messages_sent': 0,
+            'send_failures': 0,
+        }
+
+    def count(self, metric, amount=1):
+        with self.lock:
+            self.metrics[metric] += amount
+
+    def stats(self):
+        with self.lock:
+            return dict(self.metrics, idle_connections=len(self.idle))
+
+    def open(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self.discard(server)
+            raise
+        self.count('connections_opened')
+        return server
+
+    def discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+        self.count('connections_closed')
+
+    def is_healthy(self, server):
+        try:
+            return server.noop()[0] == 250
+        except OSError:
+            return False
+
+    # Returns (server, messages_sent) from the idle list, or a freshly opened session
+    def acquire(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                server, sent, idle_since = self.idle.pop()
+            if time.monotonic() - idle_since > self.idle_timeout:
+                self.discard(server)
+            elif self.is_healthy(server):
+                self.count('connections_reused')
+                return server, sent
+            else:
+                self.count('health_check_failures')
+                self.discard(server)
+        return self.open(), 0
+
+    def release(self, server, sent):
+        if sent < self.max_messages_per_connection:
+            with self.lock:
+                if len(self.idle) < self.max_idle:
+                    self.idle.append((server, sent, time.monotonic()))
+                    return
+        self.discard(server)
+
+    @contextmanager
+    def connection(self):
+        server, sent = self.acquire()
+        try:
+            yield server
+        except Exception as e:
+            if is_connection_error(e):
+                self.discard(server)
+            else:
+                self.release(server, sent)
+            raise
+        else:
+            self.release(server, sent + 1)
+
+    def send(self, to_email, subject, body):
+        msg = build_message(self.from_email, to_email, subject, body)
+        try:
+            with self.connection() as server:
+                server.sendmail(self.from_email, to_email, msg.as_string())
+        except Exception:
+            self.count('send_failures')
+            raise
+        self.count('messages_sent')
+
+    # Send (to_email, subject, body) messages over as few sessions as possible.
+    # Returns one entry per message: None when sent, otherwise the exception raised. results, if
+    # given, is filled in as the batch goes, so the caller knows what went out even if it is cut short.
+    def send_batch(self, messages, results=None):
+        results = [] if results is None else results
+        server = None
+        sent = 0
+        connect_error = None
+        try:
+            for to_email, subject, body in messages:
+                error = connect_error
+                if connect_error is None:
+                    # Retry once on a fresh session if the current one has dropped
+                    for attempt in range(2):
+                        if server is None:
+                            try:
+                                server, sent = self.acquire()
+                            except Exception as e:
+                                # Server unreachable: fail the rest of the batch without reconnecting
+                                connect_error = error = e
+                                break
+                        try:
+                            msg = build_message(self.from_email, to_email, subject, body)
+                            server.sendmail(self.from_email, to_email, msg.as_string())
+                        except Exception as e:
+                            error = e
+                            if isinstance(e, smtplib.SMTPException) and not is_connection_error(e):
+                                break  # Refused by the server, which has reset the session
+                            # Dropped, or failed partway through a command (e.g. an address that
+                            # cannot be encoded): the session's state is unknown
+                            self.discard(server)
+                            server = None
+                            if not is_connection_error(e):
+                                break
+                        else:
+                            sent += 1
+                            error = None
+                            break
+                self.count('send_failures' if error else 'messages_sent')
+                results.append(error)
+                if server is not None and sent >= self.max_messages_per_connection:
+                    self.release(server, sent)
+                    server = None
+        except BaseException:
+            if server is not None:
+                self.discard(server)
+            raise
+        if server is not None:
+            self.release(server, sent)
+        return results
+
+    # Close sessions that have been idle for longer than idle_timeout
+    def prune(self):
+        now = time.monotonic()
+        with self.lock:
+            expired = [entry for entry in self.idle if now - entry[2] > self.idle_timeout]
+            self.idle = [entry for entry in self.idle if now - entry[2] <= self.idle_timeout]
+        for server, _, _ in expired:
+            self.discard(server)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for server, _, _ in idle:
+            self.discard(server)
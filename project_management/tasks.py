@@ -0,0 +1,215 @@
+from project_management.connection import get_cursor, publish_change, transaction
+from project_management.notifications import (notification_config, notify_admin, send_email_notification,
+                                               send_in_app_notification, send_sms_notification)
+from project_management.text_search import strip_html, to_match_query
+from project_management.users import get_username, is_admin
+
+# Number of search results per page
+SEARCH_PAGE_SIZE = 20
+
+TASK_STATUSES = ['New', 'Opened', 'In-Progress', 'Completed', 'Re-Opened', 'Closed']
+
+# Build the WHERE clause for a project's task list, with optional status/assignee filters
+def task_filter_clause(project_id, user_id, statuses=None, assignee_ids=None, after_id=None):
+    where = 'tasks.project_id=?'
+    params = [project_id]
+    if after_id is not None:
+        where += ' AND tasks.id>?'
+        params.append(after_id)
+    if not is_admin(user_id):
+        where += ' AND tasks.assigned_to=?'
+        params.append(user_id)
+    if statuses:
+        where += f" AND tasks.status IN ({', '.join('?' * len(statuses))})"
+        params.extend(statuses)
+    if assignee_ids:
+        where += f" AND tasks.assigned_to IN ({', '.join('?' * len(assignee_ids))})"
+        params.extend(assignee_ids)
+    return where, params
+
+# Tasks are paged by id (keyset): pass the last id of the previous page as after_id
+def get_tasks(project_id, user_id, statuses=None, assignee_ids=None, after_id=None, limit=None):
+    c = get_cursor()
+    where, params = task_filter_clause(project_id, user_id, statuses, assignee_ids, after_id)
+    query = f'SELECT * FROM tasks WHERE {where} ORDER BY tasks.id'
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    c.execute(query, params)
+    return c.fetchall()
+
+def get_task(task_id):
+    c = get_cursor()
+    c.execute('SELECT id, project_id, name, description, assigned_to, status FROM tasks WHERE id=?', (task_id,))
+    return c.fetchone()
+
+# Returns the new task's id
+def create_task(project_id, name, description, assigned_to, notify_email, notify_in_app, notify_sms):
+    with transaction() as c:
+        c.execute('''INSERT INTO tasks (project_id, name, description, description_text, assigned_to, status)
+                     VALUES (?, ?, ?, ?, ?, ?)
+                     RETURNING id, (SELECT email FROM users WHERE id=?), (SELECT phone_number FROM users WHERE id=?)''',
+                  (project_id, name, description, strip_html(description), assigned_to, 'New', assigned_to, assigned_to))
+        task_id, user_email, user_phone = c.fetchall()[0]
+
+        # Send notifications based on selected options and the assignee's preferences
+        notification_message = f"New task assigned: {name}"
+        channels = notification_config.for_user(assigned_to)
+
+        if notify_email and channels['email'] and user_email:
+            send_email_notification(user_email, "New Task Assigned", notification_message)
+
+        if notify_in_app and channels['in_app']:
+            send_in_app_notification(assigned_to, notification_message, task_id)
+
+        if notify_sms and channels['sms'] and user_phone:
+            send_sms_notification(user_phone, notification_message)
+        publish_change(('project', project_id))
+    return task_id
+
+# Returns False if the task no longer exists, e.g. another session deleted it
+def update_task_status(task_id, status, user_id):
+    with transaction() as c:
+        c.execute('''UPDATE tasks SET status=? WHERE id=?
+                     RETURNING name, project_id, (SELECT username FROM users WHERE id=?)''', (status, task_id, user_id))
+        rows = c.fetchall()
+        if not rows:
+            return False
+        task_name, project_id, username = rows[0]
+        notify_admin(f"Task '{task_name}' status updated to {status} by {username}", task_id)
+        publish_change(('project', project_id))
+    return True
+
+def update_task_description(task_id, description):
+    with transaction() as c:
+        c.execute('UPDATE tasks SET description=?, description_text=? WHERE id=? RETURNING project_id',
+                  (description, strip_html(description), task_id))
+        publish_change(*[('project', project_id) for project_id, in c.fetchall()])
+
+# Comments and notifications of the task are removed by ON DELETE CASCADE
+def delete_task(task_id):
+    with transaction() as c:
+        c.execute('DELETE FROM tasks WHERE id=? RETURNING project_id', (task_id,))
+        publish_change(*[('project', project_id) for project_id, in c.fetchall()])
+
+# Bulk task actions: one set-based statement per chunk of ids, one transaction and
+# one summarized admin notification per batch. Each returns the number of tasks changed.
+# RETURNING project_id tells which projects to publish a change for.
+BULK_CHUNK_SIZE = 500  # Ids per IN (...) list, well under SQLite's variable limit
+
+def id_chunks(task_ids):
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), BULK_CHUNK_SIZE):
+        chunk = task_ids[start:start + BULK_CHUNK_SIZE]
+        yield chunk, ', '.join('?' * len(chunk))
+
+def get_matching_task_ids(project_id, user_id, statuses=None, assignee_ids=None):
+    c = get_cursor()
+    where, params = task_filter_clause(project_id, user_id, statuses, assignee_ids)
+    c.execute(f'SELECT tasks.id FROM tasks WHERE {where} ORDER BY tasks.id', params)
+    return [row[0] for row in c.fetchall()]
+
+# Completed/Closed is only applied to tasks that have at least one comment, as in the single-task form
+def bulk_update_task_status(task_ids, status, user_id):
+    updated = 0
+    with transaction() as c:
+        for chunk, placeholders in id_chunks(task_ids):
+            query = f'UPDATE tasks SET status=? WHERE id IN ({placeholders}) AND status<>?'
+            if status in ['Completed', 'Closed']:
+                query += ' AND EXISTS (SELECT 1 FROM comments WHERE comments.task_id = tasks.id)'
+            c.execute(query + ' RETURNING project_id', [status] + chunk + [status])
+            project_ids = [row[0] for row in c.fetchall()]
+            updated += len(project_ids)
+            publish_change(*[('project', project_id) for project_id in set(project_ids)])
+        if updated:
+            notify_admin(f"{updated} tasks updated to {status} by {get_username(c, user_id)}")
+    return updated
+
+def bulk_reassign_tasks(task_ids, assigned_to, user_id):
+    updated = 0
+    with transaction() as c:
+        for chunk, placeholders in id_chunks(task_ids):
+            c.execute(f'''UPDATE tasks SET assigned_to=? WHERE id IN ({placeholders}) AND assigned_to IS NOT ?
+                          RETURNING project_id''', [assigned_to] + chunk + [assigned_to])
+            project_ids = [row[0] for row in c.fetchall()]
+            updated += len(project_ids)
+            publish_change(*[('project', project_id) for project_id in set(project_ids)])
+        if updated:
+            assignee = get_username(c, assigned_to)
+            notify_admin(f"{updated} tasks reassigned to {assignee} by {get_username(c, user_id)}")
+            if notification_config.for_user(assigned_to)['in_app']:
+                send_in_app_notification(assigned_to, f"{updated} tasks assigned to you")
+    return updated
+
+def bulk_delete_tasks(task_ids, user_id):
+    deleted = 0
+    with transaction() as c:
+        for chunk, placeholders in id_chunks(task_ids):
+            c.execute(f'DELETE FROM tasks WHERE id IN ({placeholders}) RETURNING project_id', chunk)
+            project_ids = [row[0] for row in c.fetchall()]
+            deleted += len(project_ids)
+            publish_change(*[('project', project_id) for project_id in set(project_ids)])
+        if deleted:
+            notify_admin(f"{deleted} tasks deleted by {get_username(c, user_id)}")
+    return deleted
+
+# Load a page of a project's tasks with assignee names and all their comments in two queries.
+# Returns the board keyed by task id and the after_id of the next page (None on the last page).
+def get_task_board(project_id, user_id, statuses=None, assignee_ids=None, after_id=None, limit=None):
+    c = get_cursor()
+    where, params = task_filter_clause(project_id, user_id, statuses, assignee_ids, after_id)
+    query = f'''SELECT tasks.id, tasks.project_id, tasks.name, tasks.description, tasks.assigned_to, tasks.status,
+                      users.username
+               FROM tasks
+               LEFT JOIN users ON tasks.assigned_to = users.id
+               WHERE {where}
+               ORDER BY tasks.id'''
+    if limit is not None:
+        query += ' LIMIT ?'
+        c.execute(query, params + [limit + 1])
+    else:
+        c.execute(query, params)
+    rows = c.fetchall()
+    next_after_id = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1][0]
+
+    board = {}
+    for row in rows:
+        board[row[0]] = {'task': row[:6], 'assignee': row[6], 'comments': []}
+    if not board:
+        return board, next_after_id
+
+    # Bound the comment query to the id range of this page
+    c.execute(f'''SELECT comments.task_id, comments.content, comments.created_at, users.username
+                  FROM comments
+                  JOIN tasks ON comments.task_id = tasks.id
+                  JOIN users ON comments.user_id = users.id
+                  WHERE {where} AND tasks.id<=?
+                  ORDER BY comments.created_at DESC''', params + [rows[-1][0]])
+    for task_id, content, created_at, username in c.fetchall():
+        board[task_id]['comments'].append((content, created_at, username))
+    return board, next_after_id
+
+# Ranked full-text search over tasks and comments across projects, visible to user_id.
+# Returns (kind, task_id, project_id, project_name, task_name, snippet) rows.
+def search_tasks(text, user_id, limit=SEARCH_PAGE_SIZE, offset=0):
+    match_query = to_match_query(text)
+    if not match_query:
+        return []
+    where = 'search_index MATCH ?'
+    params = [match_query]
+    if not is_admin(user_id):
+        where += ' AND tasks.assigned_to=?'
+        params.append(user_id)
+    c = get_cursor()
+    c.execute(f'''SELECT search_index.kind, tasks.id, projects.id, projects.name, tasks.name,
+                         snippet(search_index, 1, '**', '**', '...', 16)
+                  FROM search_index
+                  JOIN tasks ON tasks.id = search_index.task_id
+                  JOIN projects ON projects.id = tasks.project_id
+                  WHERE {where}
+                  ORDER BY bm25(search_index, 10.0, 1.0)
+                  LIMIT ? OFFSET ?''', params + [limit, offset])
+    return c.fetchall()
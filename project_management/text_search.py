@@ -0,0 +1,16 @@
+import html
+import re
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Plain text of an st_quill (HTML) description, stored in tasks.description_text for the search index
+def strip_html(text):
+    if text is None:
+        return None
+    return ' '.join(html.unescape(TAG_PATTERN.sub(' ', text)).split())
+
+# Turn free text typed by a user into a safe FTS5 query: every word must match, as a prefix
+def to_match_query(text):
+    tokens = TOKEN_PATTERN.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,85 @@
+import sqlite3
+from project_management.connection import get_connection, get_cursor, read_cache
+from project_management.credentials import CredentialsBusy, CredentialVerifier, LoginThrottle, needs_rehash
+
+# Password checks run on a bounded pool shared by all sessions; failed logins are throttled per user and client
+credential_verifier = CredentialVerifier()
+login_throttle = LoginThrottle()
+
+# Account created by create_default_admin on a database without any admin
+DEFAULT_ADMIN_USERNAME = 'admin'
+DEFAULT_ADMIN_PASSWORD = 'admin123'
+DEFAULT_ADMIN_EMAIL = 'admin@example.com'
+
+def hash_password(password):
+    return credential_verifier.hash(password)
+
+# Raises LoginThrottled when the user or client has failed too often, or too many logins are
+# being checked at once. Legacy SHA-256 and outdated hashes are rehashed after a successful login.
+def check_user(username, password, client=None):
+    login_throttle.check(username, client)
+    c = get_cursor()
+    c.execute('SELECT id, username, password, is_admin, email FROM users WHERE username=?', (username,))
+    user = c.fetchone()
+    if not credential_verifier.verify(password, user[2] if user else None):
+        login_throttle.failed(username, client)
+        return None
+    login_throttle.succeeded(username, client)
+    if needs_rehash(user[2]):
+        try:
+            new_hash = hash_password(password)
+        except CredentialsBusy:
+            return user  # Rehashed on a later login
+        c.execute('UPDATE users SET password=? WHERE id=? AND password=?', (new_hash, user[0], user[2]))
+        get_connection().commit()
+    return user
+
+def is_admin(user_id):
+    c = get_cursor()
+    c.execute('SELECT is_admin FROM users WHERE id=?', (user_id,))
+    return c.fetchone()[0] == 1
+
+# Returns False if the username is taken; raises CredentialsBusy when too many passwords are being hashed
+def create_user(username, password, email, is_admin=0):
+    c = get_cursor()
+    try:
+        c.execute('INSERT INTO users (username, password, is_admin, email) VALUES (?, ?, ?, ?)',
+                  (username, hash_password(password), is_admin, email))
+        get_connection().commit()
+        get_users.invalidate()
+        if is_admin:
+            get_admin_ids.invalidate()
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def get_username(c, user_id):
+    c.execute('SELECT username FROM users WHERE id=?', (user_id,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+@read_cache.cached
+def get_users():
+    c = get_cursor()
+    c.execute('SELECT id, username FROM users WHERE is_admin=0')
+    return c.fetchall()
+
+# Uncached check that a task can be assigned to the user, i.e. they exist and are not an admin
+def is_assignable_user(user_id):
+    c = get_cursor()
+    c.execute('SELECT 1 FROM users WHERE id=? AND is_admin=0', (user_id,))
+    return c.fetchone() is not None
+
+# Admin ids are cached across reruns; create_user invalidates them when it adds an admin.
+# The TTL picks up admins added outside the app, e.g. by add_admin.py.
+@read_cache.cached
+def get_admin_ids():
+    c = get_cursor()
+    c.execute('SELECT id FROM users WHERE is_admin=1')
+    return tuple(row[0] for row in c.fetchall())
+
+# Create the initial admin account if there is no admin yet; returns True if it was created
+def create_default_admin():
+    if get_admin_ids():
+        return False
+    return create_user(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, DEFAULT_ADMIN_EMAIL, is_admin=1)
@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from project_management import connection, projects, users
+from project_management.bootstrap import bootstrap
+from project_management.comments import add_comment
+from project_management.tasks import get_tasks
+from timing import percentile
+
+# Concurrency stress test: N simulated sessions hammer get_tasks and add_comment
+# on a scratch copy of the database and report throughput, latency and lock errors.
+
+def run_session(project_id, user_id, write_ratio, deadline, results):
+    reads, writes, errors = [], [], []
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if random.random() < write_ratio:
+                task_id = random.choice(get_tasks(project_id, user_id))[0]
+                add_comment(task_id, user_id, 'stress test comment')
+                writes.append(time.perf_counter() - start)
+            else:
+                get_tasks(project_id, user_id)
+                reads.append(time.perf_counter() - start)
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+        finally:
+            # Each operation stands for one rerun, which returns its connection to the pool
+            connection.release_connection()
+    results.append((reads, writes, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description='Hammer get_tasks and add_comment from concurrent sessions')
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Run against a scratch database
+    connection.DB_PATH = os.path.join(tempfile.mkdtemp(), 'project_management.db')
+    bootstrap()
+
+    users.create_user('stress', 'stress', 'stress@example.com')
+    projects.create_project('Stress', 'Stress test project')
+    user_id = users.check_user('stress', 'stress')[0]
+    project_id = projects.get_projects()[-1][0]
+    with connection.transaction() as c:
+        c.executemany('''INSERT INTO tasks (project_id, name, description, description_text, assigned_to, status)
+                         VALUES (?, ?, ?, ?, ?, ?)''',
+                      [(project_id, f'Task {i}', 'Stress test task', 'Stress test task', user_id, 'New')
+                       for i in range(args.tasks)])
+
+    results = []
+    deadline = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=run_session,
+                                args=(project_id, user_id, args.write_ratio, deadline, results))
+               for _ in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reads = [t for session in results for t in session[0]]
+    writes = [t for session in results for t in session[1]]
+    errors = [e for session in results for e in session[2]]
+    print(f"{args.sessions} sessions, {args.seconds:g}s, journal_mode="
+          f"{connection.get_cursor().execute('PRAGMA journal_mode').fetchone()[0]}")
+    for name, timings in (('get_tasks', reads), ('add_comment', writes)):
+        print(f"{name:12} {len(timings) / args.seconds:8.1f} ops/s  "
+              f"p50 {percentile(timings, 0.5) * 1000:7.2f} ms  p95 {percentile(timings, 0.95) * 1000:7.2f} ms  "
+              f"p99 {percentile(timings, 0.99) * 1000:7.2f} ms")
+    print(f"lock errors: {len(errors)}")
+    for error in sorted(set(errors)):
+        print(f"  {error}")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
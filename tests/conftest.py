@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project_management import connection
+
+# Point the app's connection pool at a scratch database; the archive directory lands in tmp_path too
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'project_management.db')
+    monkeypatch.setattr(connection, 'DB_PATH', path)
+    monkeypatch.setattr(connection, 'connections', None)
+    yield path
+    if connection.connections is not None:
+        connection.connections.release()
+        connection.connections.close_all()
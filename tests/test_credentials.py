@@ -0,0 +1,66 @@
+import threading
+import time
+import pytest
+from project_management import schema, users
+from project_management.credentials import CredentialsBusy, CredentialVerifier, LoginThrottle, LoginThrottled
+
+# A verifier whose only slot is taken until the returned event is set
+@pytest.fixture
+def saturated_verifier(monkeypatch):
+    verifier = CredentialVerifier(max_workers=1, max_pending=1, timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=verifier.run, args=(block,))
+    thread.start()
+    started.wait()
+    monkeypatch.setattr(users, 'credential_verifier', verifier)
+    yield verifier
+    release.set()
+    thread.join()
+    verifier.shutdown()
+
+def test_create_user_reports_busy_hashing(db_path, saturated_verifier):
+    schema.init_db()
+    with pytest.raises(CredentialsBusy):
+        users.create_user('ann', 'secret', 'ann@example.com')
+    assert users.get_cursor().execute("SELECT COUNT(*) FROM users WHERE username='ann'").fetchone()[0] == 0
+
+def test_login_reports_busy_verifier_as_throttled(db_path, saturated_verifier):
+    schema.init_db()
+    with pytest.raises(LoginThrottled):
+        users.check_user('nobody', 'secret')
+
+def test_dummy_hash_is_made_on_the_pool():
+    verifier = CredentialVerifier(max_workers=1)
+    callers = []
+    original_run = verifier.run
+    verifier.run = lambda func, *args: callers.append(func.__name__) or original_run(func, *args)
+    try:
+        assert verifier.verify('secret', None) is False
+    finally:
+        verifier.shutdown()
+    assert callers == ['hash_password', 'verify_password']
+    assert verifier.dummy_hash is not None
+
+def test_throttle_forgets_expired_and_stalest_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    throttle = LoginThrottle(window=60, max_per_user=2, max_keys=4)
+    throttle.failed('old', '10.0.0.1')
+    now[0] += 61
+    throttle.failed('ann', '10.0.0.2')
+    assert list(throttle.failures) == [('user', 'ann'), ('client', '10.0.0.2')]
+
+    # Sprayed usernames push out the keys that failed longest ago, never more than max_keys
+    for i in range(10):
+        throttle.failed(f'spray{i}', '10.0.0.3')
+    assert len(throttle.failures) == 4
+    assert ('client', '10.0.0.3') in throttle.failures
+    throttle.failed('spray9')
+    with pytest.raises(LoginThrottled):
+        throttle.check('spray9')
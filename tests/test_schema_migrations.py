@@ -0,0 +1,144 @@
+import json
+import sqlite3
+from project_management import connection, schema
+
+# Schema and data as the app created them before migrations were tracked (user_version 0)
+BASELINE_SCHEMA = '''
+CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT, is_admin INTEGER,
+                    email TEXT, phone_number TEXT);
+CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+CREATE TABLE tasks (id INTEGER PRIMARY KEY, project_id INTEGER, name TEXT, description TEXT,
+                    assigned_to INTEGER, status TEXT,
+                    FOREIGN KEY (project_id) REFERENCES projects(id),
+                    FOREIGN KEY (assigned_to) REFERENCES users(id));
+CREATE TABLE comments (id INTEGER PRIMARY KEY, task_id INTEGER, user_id INTEGER, content TEXT, created_at TIMESTAMP,
+                       FOREIGN KEY (task_id) REFERENCES tasks(id),
+                       FOREIGN KEY (user_id) REFERENCES users(id));
+CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, created_at TIMESTAMP,
+                            FOREIGN KEY (user_id) REFERENCES users(id));
+CREATE TABLE notification_settings (id INTEGER PRIMARY KEY, email INTEGER, in_app INTEGER, sms INTEGER);
+
+CREATE INDEX idx_tasks_name ON tasks (name);
+CREATE TABLE comment_log (comment_id INTEGER);
+CREATE TRIGGER comment_log_insert AFTER INSERT ON comments
+BEGIN
+    INSERT INTO comment_log (comment_id) VALUES (NEW.id);
+END;
+
+INSERT INTO users VALUES (1, 'admin', 'x', 1, 'admin@example.com', NULL), (2, 'ann', 'x', 0, 'ann@example.com', NULL);
+INSERT INTO projects VALUES (1, 'Apollo', 'Moon'), (2, 'Gemini', 'Orbit');
+INSERT INTO tasks VALUES
+    (1, 1, 'Design', '<p>Lunar <b>lander</b></p>', 2, 'New'),
+    (2, 2, 'Launch', '<p>Rocket</p>', 2, 'Completed'),
+    (3, 9, 'Lost', 'Project 9 was deleted', 2, 'New'),
+    (4, 1, 'Stale assignee', 'Assigned to a deleted user', 7, 'New');
+INSERT INTO comments VALUES
+    (1, 1, 2, 'Looks good', '2024-01-01 10:00:00'),
+    (2, 3, 2, 'On the lost task', '2024-01-01 10:00:00'),
+    (3, 8, 2, 'Task 8 was deleted', '2024-01-01 10:00:00'),
+    (4, 2, 7, 'By a deleted user', '2024-01-01 10:00:00');
+INSERT INTO notifications VALUES
+    (1, 2, 'Hello ann', '2024-01-01 10:00:00'),
+    (2, 7, 'For a deleted user', '2024-01-01 10:00:00');
+'''
+
+def build_baseline(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+
+def archived_ids(archive_dir, table):
+    return [json.loads(line)['id'] for path in archive_dir.glob(f'{table}-*.jsonl')
+            for line in path.read_text().splitlines()]
+
+def ids(c, table):
+    return [row[0] for row in c.execute(f'SELECT id FROM {table} ORDER BY id')]
+
+def test_baseline_database_migrates(db_path, tmp_path, capsys):
+    build_baseline(db_path)
+    schema.init_db()
+    c = connection.get_cursor()
+
+    assert c.execute('PRAGMA user_version').fetchone()[0] == len(schema.MIGRATIONS)
+    assert c.execute('PRAGMA foreign_key_check').fetchall() == []
+
+    # Orphans are archived and reported, everything else is kept
+    assert ids(c, 'tasks') == [1, 2, 4]
+    assert ids(c, 'comments') == [1, 4]
+    assert ids(c, 'notifications') == [1]
+    assert c.execute('SELECT assigned_to FROM tasks WHERE id=4').fetchone()[0] is None
+    assert c.execute('SELECT user_id FROM comments WHERE id=4').fetchone()[0] is None
+    archived = {table: archived_ids(tmp_path / 'archive', table) for table in ('tasks', 'comments', 'notifications')}
+    assert archived == {'tasks': [3], 'comments': [2, 3], 'notifications': [2]}
+    output = capsys.readouterr().out
+    assert '1 tasks, 2 comments, 1 notifications' in output
+
+    # Indexes and triggers on the rebuilt tables survive, including ones the app did not create
+    names = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+    assert {'idx_tasks_name', 'comment_log_insert', 'idx_tasks_project_status', 'idx_comments_task_created',
+            'project_stats_task_insert', 'search_index_task_insert', 'search_index_comment_insert'} <= names
+    c.execute("INSERT INTO comments (task_id, user_id, content) VALUES (1, 2, 'after migration')")
+    assert c.execute('SELECT MAX(comment_id), COUNT(*) FROM comment_log').fetchone() == (5, 5)
+    assert c.execute('SELECT total_tasks, completed_tasks FROM project_stats WHERE project_id=2').fetchone() == (1, 1)
+    assert c.execute("SELECT task_id FROM search_index WHERE search_index MATCH 'lander'").fetchall() == [(1,)]
+
+def test_migrated_foreign_keys_cascade(db_path):
+    build_baseline(db_path)
+    schema.init_db()
+    c = connection.get_cursor()
+    c.execute("INSERT INTO notifications (user_id, message, task_id) VALUES (1, 'About task 1', 1)")
+
+    c.execute('DELETE FROM projects WHERE id=1')
+    assert ids(c, 'tasks') == [2]
+    assert ids(c, 'comments') == [4]
+    assert ids(c, 'notifications') == [1]
+    assert c.execute('SELECT COUNT(*) FROM project_stats WHERE project_id=1').fetchone()[0] == 0
+    assert c.execute("SELECT COUNT(*) FROM search_index WHERE kind='task'").fetchone()[0] == 1
+
+    c.execute('DELETE FROM users WHERE id=2')
+    assert c.execute('SELECT assigned_to FROM tasks WHERE id=2').fetchone()[0] is None
+    assert ids(c, 'notifications') == []
+    assert c.execute('PRAGMA foreign_key_check').fetchall() == []
+
+def test_migrations_are_idempotent(db_path):
+    build_baseline(db_path)
+    schema.init_db()
+    c = connection.get_cursor()
+    before = c.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall()
+    schema.init_db()
+    assert c.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall() == before
+
+def test_deleted_notification_ids_are_not_reused(db_path):
+    from project_management.comments import add_comment
+    from project_management.notifications import get_notification_feed, get_unread_count
+    from project_management.tasks import bulk_delete_tasks
+    build_baseline(db_path)
+    schema.init_db()
+
+    add_comment(1, 2, 'Ready for review')
+    last_id = get_notification_feed(1)[0][0]
+    # Deleting the task cascades to the newest notifications, then adds one of its own
+    bulk_delete_tasks([1], 1)
+    assert get_unread_count(1) == 1
+    assert [row[1] for row in get_notification_feed(1, after_id=last_id)] == ['1 tasks deleted by admin']
+
+def test_notifications_rebuilt_without_autoincrement_get_it(db_path):
+    build_baseline(db_path)
+    schema.init_db()
+    c = connection.get_cursor()
+    # As left by the cascade migration before it declared AUTOINCREMENT
+    columns = schema.CASCADE_TABLES['notifications'][0].replace(' AUTOINCREMENT', '')
+    c.execute('PRAGMA foreign_keys=OFF')
+    schema.rebuild_tables(c, {'notifications': (columns, 'id, user_id, message, created_at, is_read, task_id')})
+    c.execute('PRAGMA foreign_keys=ON')
+    c.execute("INSERT INTO notifications (user_id, message) VALUES (1, 'newest')")
+    c.execute(f'PRAGMA user_version = {len(schema.MIGRATIONS) - 1}')
+    connection.get_connection().commit()
+
+    schema.init_db()
+    assert 'AUTOINCREMENT' in c.execute("SELECT sql FROM sqlite_master WHERE name='notifications'").fetchone()[0]
+    assert ids(c, 'notifications') == [1, 2]
+    assert 'idx_notifications_task' in {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    c.execute('DELETE FROM notifications WHERE id=2')
+    c.execute("INSERT INTO notifications (user_id, message) VALUES (1, 'after')")
+    assert ids(c, 'notifications') == [1, 3]
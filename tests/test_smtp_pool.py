@@ -0,0 +1,156 @@
+import socketserver
+import threading
+import pytest
+from project_management import schema
+from project_management.connection import get_cursor, transaction
+from project_management.email_outbox import OutboxWorker, queue_email
+from project_management.smtp_pool import SMTPPool
+
+# Just enough SMTP for smtplib without TLS or login: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT
+class SMTPHandler(socketserver.StreamRequestHandler):
+    timeout = 10
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.sessions += 1
+        self.reply('220 localhost test server')
+        mailfrom, rcpttos = None, []
+        for line in self.rfile:
+            verb, _, arg = line.decode('ascii', 'replace').rstrip('\r\n').partition(' ')
+            verb = verb.upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                mailfrom, rcpttos = arg.partition(':')[2].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpttos.append(arg.partition(':')[2].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                with self.server.lock:
+                    self.server.messages.append((mailfrom, rcpttos))
+                mailfrom, rcpttos = None, []
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                mailfrom, rcpttos = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class RecordingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []  # (mailfrom, rcpttos)
+        self.sessions = 0
+
+# Local SMTP server without TLS or login, served from a background thread
+@pytest.fixture
+def smtp_server():
+    server = RecordingServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+def smtp_settings(server):
+    return {'host': '127.0.0.1', 'port': server.socket.getsockname()[1], 'user': None, 'password': None,
+            'use_tls': False, 'from_email': 'noreply@example.com'}
+
+def test_send_batch_uses_one_connection(smtp_server):
+    pool = SMTPPool(**smtp_settings(smtp_server))
+    results = pool.send_batch([(f'user{i}@example.com', 'Subject', 'Body') for i in range(5)])
+    pool.close()
+    assert results == [None] * 5
+    stats = pool.stats()
+    assert stats['connections_opened'] == 1
+    assert stats['messages_sent'] == 5
+    assert smtp_server.sessions == 1
+    assert [mailfrom for mailfrom, _ in smtp_server.messages] == ['noreply@example.com'] * 5
+
+def test_outbox_drains_a_batch_over_one_connection(db_path, smtp_server):
+    schema.init_db()
+    with transaction() as c:
+        for i in range(10):
+            queue_email(c, f'user{i}@example.com', 'New Task Assigned', f'Task {i}')
+    worker = OutboxWorker(db_path, batch_size=10, **smtp_settings(smtp_server))
+    try:
+        assert worker.drain() == 10
+        assert worker.drain() == 0
+    finally:
+        worker.stop()
+    assert worker.pool.stats()['connections_opened'] == 1
+    assert sorted(to for _, (to,) in smtp_server.messages) == sorted(f'user{i}@example.com' for i in range(10))
+    c = get_cursor()
+    assert c.execute('SELECT COUNT(*) FROM email_outbox WHERE sent_at IS NULL').fetchone()[0] == 0
+
+def test_idle_connection_is_reused_by_the_next_batch(smtp_server):
+    pool = SMTPPool(**smtp_settings(smtp_server))
+    pool.send_batch([('a@example.com', 'One', 'Body')])
+    pool.send_batch([('b@example.com', 'Two', 'Body')])
+    pool.close()
+    stats = pool.stats()
+    assert (stats['connections_opened'], stats['connections_reused']) == (1, 1)
+
+def test_batch_survives_an_address_that_cannot_be_encoded(smtp_server):
+    pool = SMTPPool(**smtp_settings(smtp_server))
+    results = pool.send_batch([('a@example.com', 'One', 'Body'), ('jürgen@example.com', 'Two', 'Body'),
+                               ('b@example.com', 'Three', 'Body')])
+    pool.close()
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], UnicodeEncodeError)
+    assert [to for _, (to,) in smtp_server.messages] == ['a@example.com', 'b@example.com']
+    # The session was mid-command when it failed, so the next message got a fresh one
+    assert pool.stats()['connections_opened'] == 2
+
+def outbox_rows():
+    return get_cursor().execute('SELECT to_email, attempts, sent_at IS NOT NULL, last_error IS NOT NULL '
+                                'FROM email_outbox ORDER BY id').fetchall()
+
+def test_outbox_records_each_message_of_a_failing_batch(db_path, smtp_server):
+    schema.init_db()
+    with transaction() as c:
+        for to_email in ('a@example.com', 'jürgen@example.com', 'b@example.com'):
+            queue_email(c, to_email, 'Subject', 'Body')
+    worker = OutboxWorker(db_path, **smtp_settings(smtp_server))
+    try:
+        assert worker.drain() == 2
+        assert worker.drain() == 0  # The failed message waits for its backoff
+    finally:
+        worker.stop()
+    assert outbox_rows() == [('a@example.com', 1, 1, 0), ('jürgen@example.com', 1, 0, 1), ('b@example.com', 1, 1, 0)]
+    assert len(smtp_server.messages) == 2
+
+def test_outbox_writes_back_results_when_the_batch_is_cut_short(db_path, smtp_server):
+    schema.init_db()
+    with transaction() as c:
+        for to_email in ('a@example.com', 'b@example.com'):
+            queue_email(c, to_email, 'Subject', 'Body')
+    worker = OutboxWorker(db_path, **smtp_settings(smtp_server))
+
+    def send_one_then_fail(messages, results):
+        results.append(None)
+        raise RuntimeError('worker interrupted')
+
+    worker.pool.send_batch = send_one_then_fail
+    with pytest.raises(RuntimeError):
+        worker.drain()
+    worker.stop()
+    assert outbox_rows() == [('a@example.com', 1, 1, 0), ('b@example.com', 1, 0, 1)]
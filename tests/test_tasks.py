@@ -0,0 +1,21 @@
+from project_management import connection, schema
+from project_management.comments import add_comment, get_comments
+from project_management.projects import create_project
+from project_management.tasks import create_task, delete_task, get_task, update_task_status
+from project_management.users import create_user, get_users
+
+def test_changes_to_a_deleted_task_report_not_found(db_path):
+    schema.init_db()
+    create_user('ann', 'secret', 'ann@example.com')
+    create_project('Apollo', 'Moon')
+    (ann_id, _), = get_users()
+    task_id = create_task(1, 'Design', '<p>Lander</p>', ann_id, False, False, False)
+
+    assert add_comment(task_id, ann_id, 'Started') is True
+    assert update_task_status(task_id, 'Opened', ann_id) is True
+    delete_task(task_id)
+    assert add_comment(task_id, ann_id, 'Too late') is False
+    assert update_task_status(task_id, 'Completed', ann_id) is False
+    assert get_task(task_id) is None
+    assert get_comments(task_id) == []
+    assert connection.get_cursor().execute('SELECT COUNT(*) FROM comments').fetchone()[0] == 0
@@ -0,0 +1,8 @@
+# Shared by benchmark.py, stress_test.py and api_load_test.py
+
+# Nearest-rank percentile of a list of timings; fraction is e.g. 0.95 for p95
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]